@@ -0,0 +1,63 @@
+"""
+    Batch memory benchmark.
+
+    Compares the memory held by one subscriber batch kept as a list of
+    (usernumber, customer key, None) tuples against the same batch kept column
+    wise, and the size each of them is shipped to a session worker with.
+
+    Usage (from the repository root): python -m bin.benchmarks.batch_memory_benchmark [batch_size]
+
+"""
+import cPickle
+import sys
+
+from bin.benchmarks.generation_benchmark import BenchmarkKeyJournal, get_configuration, get_subscriber_group
+from bin.dbclient.batch_transport import ChunkCodec
+from bin.executor.batch_generator import BatchGeneratorForSubscriberWithoutDependents
+
+
+def get_row_list_size(rows):
+    # List, tuples and every object they refer to; None is shared
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            if value is None:
+                continue
+            size += sys.getsizeof(value)
+            if hasattr(value, '__dict__'):
+                size += sys.getsizeof(value.__dict__) + sum(sys.getsizeof(attribute) for attribute in value.__dict__.itervalues())
+    return size
+
+
+def get_columnar_batch_size(columnar_batch):
+    size = sys.getsizeof(columnar_batch) + sys.getsizeof(columnar_batch.get_columns())
+    for _, data in columnar_batch.get_columns():
+        if data is not None:
+            size += sys.getsizeof(data)
+    return size
+
+
+def report(name, batch_size, memory_size, shipped_size):
+    print("%-10s: [ %10d ] bytes held, [ %6.1f ] bytes per row, [ %10d ] bytes shipped" % (name, memory_size, float(memory_size) / batch_size, shipped_size))
+
+
+def main():
+    batch_size = 100000
+    if sys.argv.__len__() > 1:
+        batch_size = int(sys.argv[1])
+
+    subscriber_group = get_subscriber_group("1%PLACE_HOLDER%000", "%PLACE_HOLDER%", 100000, 100000 + batch_size - 1)
+    batch_generator = BatchGeneratorForSubscriberWithoutDependents(subscriber_group, get_configuration(batch_size), BenchmarkKeyJournal())
+    columnar_batch = batch_generator.prepare().__getitem__(3)
+    rows = columnar_batch.to_rows()
+
+    print("Batch size: [ %d ]" % batch_size)
+    row_list_size = get_row_list_size(rows)
+    columnar_batch_size = get_columnar_batch_size(columnar_batch)
+    report("Rows", batch_size, row_list_size, len(cPickle.dumps(rows, cPickle.HIGHEST_PROTOCOL)))
+    report("Columnar", batch_size, columnar_batch_size, len(cPickle.dumps(ChunkCodec.pack(columnar_batch), cPickle.HIGHEST_PROTOCOL)))
+    print("Reduction: [ %.1f ]x" % (float(row_list_size) / columnar_batch_size))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+    Checkpoint benchmark.
+
+    Measures what checkpointing acknowledged ranges costs. Completion callbacks of
+    the session pools and of the async engine only count the chunks of a range and
+    queue it; the time they spend on it is measured first. Then the same ranges go
+    through the writer thread of the checkpoint journal, with different sync
+    intervals, against a write and fsync of every range right on the completion
+    thread, which is what a completion would cost without the writer thread.
+
+    Before that, what a resumed run relies on is checked: ranges read back from a
+    journal are sorted and merged, a record cut short by a crash is dropped, also
+    when ranges are appended after it, and the chunk planner leaves skipped ranges
+    out of the plan.
+
+    Usage (from the repository root): python -m bin.benchmarks.checkpoint_benchmark [range_count] [chunks_per_range]
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bin.commons.checkpoint_journal import RangeCheckpointJournal, RangeCheckpointJournalReader
+from bin.executor.chunk_planner import ChunkPlanner
+
+
+CHUNK_SIZE = 1000
+SYNC_INTERVALS = (0, 10, 1000)
+
+
+def get_checkpoint_tags(range_count, chunks_per_range):
+    # Every chunk of every range, in the order they complete
+    checkpoint_tags = []
+    for range_index in xrange(range_count):
+        checkpoint_tag = ("0", range_index * CHUNK_SIZE, (range_index + 1) * CHUNK_SIZE, chunks_per_range)
+        checkpoint_tags.extend([checkpoint_tag] * chunks_per_range)
+    return checkpoint_tags
+
+
+def check(name, actual, expected):
+    if actual != expected:
+        print("Resume check [ %s ] failed: %s, expected %s" % (name, actual, expected))
+        return False
+    return True
+
+
+def check_chunk_planner(total_size, chunk_size, start_offset, skipped_ranges, expected_pending_ranges):
+    chunk_planner = ChunkPlanner(total_size, chunk_size, start_offset, skipped_ranges)
+    name = "plan of [ %d, %d ) skipping %s" % (start_offset, start_offset + total_size, skipped_ranges)
+    expected_chunks = [(chunk_start_offset, min(chunk_start_offset + chunk_size, pending_end_offset))
+                       for pending_start_offset, pending_end_offset in expected_pending_ranges
+                       for chunk_start_offset in xrange(pending_start_offset, pending_end_offset, chunk_size)]
+    handed_out_chunks = []
+    while chunk_planner.has_next():
+        handed_out_chunks.append(chunk_planner.next_chunk())
+    end_offset = start_offset + total_size
+    return (check(name + " pending ranges", chunk_planner.get_pending_ranges(), expected_pending_ranges) and
+            check(name + " chunks", list(chunk_planner.get_chunks()), expected_chunks) and
+            check(name + " chunks handed out", handed_out_chunks, expected_chunks) and
+            check(name + " chunk count", chunk_planner.get_chunk_count(), expected_chunks.__len__()) and
+            check(name + " chunk after the last", chunk_planner.next_chunk(), (end_offset, end_offset)))
+
+
+def check_resume():
+    # Records out of order, overlapping and adjacent, then one cut short by a crash
+    filename = RangeCheckpointJournal.get_filename(RangeCheckpointJournal.POPULATION_SCENARIO, "0")
+    with open(filename, 'wb') as write_fd:
+        for start_offset, end_offset in ((4000, 5000), (0, 1000), (6000, 7000), (1000, 2000), (4500, 5500), (3000, 4000)):
+            write_fd.write(RangeCheckpointJournal.RANGE_RECORD.pack(start_offset, end_offset))
+        write_fd.write(RangeCheckpointJournal.RANGE_RECORD.pack(8000, 9000)[:5])
+    checkpoint_journal_reader = RangeCheckpointJournalReader(RangeCheckpointJournal.POPULATION_SCENARIO)
+    is_passed = check("merged ranges", checkpoint_journal_reader.get_acknowledged_ranges("0"), [(0, 2000), (3000, 5500), (6000, 7000)])
+
+    # A resumed run appends its ranges after the ones of the interrupted run
+    checkpoint_journal = RangeCheckpointJournal(RangeCheckpointJournal.POPULATION_SCENARIO, 0)
+    checkpoint_journal.open()
+    checkpoint_journal.acknowledge(("0", 2000, 3000, 2), True)
+    checkpoint_journal.acknowledge(("0", 7000, 8000, 1), True)
+    checkpoint_journal.acknowledge(("0", 9000, 10000, 2), True) # A chunk of it is still to complete
+    checkpoint_journal.acknowledge(("0", 2000, 3000, 2), True)
+    checkpoint_journal.acknowledge(("0", 8000, 9000, 2), True)
+    checkpoint_journal.acknowledge(("0", 8000, 9000, 2), False)
+    checkpoint_journal.close()
+    is_passed = is_passed and check("ranges appended after a cut short record", checkpoint_journal_reader.get_acknowledged_ranges("0"), [(0, 5500), (6000, 8000)])
+    is_passed = is_passed and check("ranges of another group", checkpoint_journal_reader.get_acknowledged_ranges("1"), [])
+    checkpoint_journal.discard("0")
+
+    return (is_passed and
+            check_chunk_planner(10000, 1000, 0, [], [(0, 10000)]) and
+            check_chunk_planner(10000, 1000, 0, [(0, 5500), (6000, 8000)], [(5500, 6000), (8000, 10000)]) and
+            check_chunk_planner(10000, 1000, 0, [(0, 2500), (4000, 4500), (9500, 12000)], [(2500, 4000), (4500, 9500)]) and
+            check_chunk_planner(5000, 1000, 5000, [(0, 2000), (3000, 6200), (7000, 7100)], [(6200, 7000), (7100, 10000)]) and
+            check_chunk_planner(5000, 1000, 5000, [(0, 10000)], []) and
+            check_chunk_planner(5000, 1000, 5000, [(10000, 12000)], [(5000, 10000)]))
+
+
+def run_journal(checkpoint_tags, checkpoint_interval):
+    checkpoint_journal = RangeCheckpointJournal(RangeCheckpointJournal.POPULATION_SCENARIO, checkpoint_interval)
+    checkpoint_journal.discard("0")
+    checkpoint_journal.open()
+    start_time = time.time()
+    for checkpoint_tag in checkpoint_tags:
+        checkpoint_journal.acknowledge(checkpoint_tag, True)
+    completion_time = time.time() - start_time
+    checkpoint_journal.close()
+    elapsed_time = time.time() - start_time
+    return checkpoint_journal, completion_time, elapsed_time
+
+
+def run_inline(range_count):
+    # Every range written and synced by the completion which acknowledged it
+    filename = RangeCheckpointJournal.get_filename("inline", "0")
+    start_time = time.time()
+    with open(filename, 'wb') as write_fd:
+        for range_index in xrange(range_count):
+            write_fd.write(RangeCheckpointJournal.RANGE_RECORD.pack(range_index * CHUNK_SIZE, (range_index + 1) * CHUNK_SIZE))
+            write_fd.flush()
+            os.fsync(write_fd.fileno())
+    return time.time() - start_time
+
+
+def main():
+    range_count = 2000
+    chunks_per_range = 1
+    if sys.argv.__len__() > 1:
+        range_count = int(sys.argv[1])
+    if sys.argv.__len__() > 2:
+        chunks_per_range = int(sys.argv[2])
+
+    # Journal files go to a temporary directory
+    checkpoint_dir = tempfile.mkdtemp()
+    RangeCheckpointJournal.CHECKPOINT_FILE = os.path.join(checkpoint_dir, "checkpoint_")
+    try:
+        if not check_resume():
+            sys.exit(1)
+        print("Resume check: [ OK ]")
+
+        checkpoint_tags = get_checkpoint_tags(range_count, chunks_per_range)
+        print("Ranges: [ %d ], Chunks per range: [ %d ], Chunk size: [ %d ]" % (range_count, chunks_per_range, CHUNK_SIZE))
+        for checkpoint_interval in SYNC_INTERVALS:
+            checkpoint_journal, completion_time, elapsed_time = run_journal(checkpoint_tags, checkpoint_interval)
+            acknowledged_ranges = RangeCheckpointJournalReader(RangeCheckpointJournal.POPULATION_SCENARIO).get_acknowledged_ranges("0")
+            print("Writer thread, sync interval [ %4d ] ms: [ %.2f ] us per chunk on completion, [ %.3f ] seconds until synced, acknowledged: %s" % (checkpoint_interval,
+                                                                                                                                                    completion_time * 1000000 / checkpoint_tags.__len__(),
+                                                                                                                                                    elapsed_time,
+                                                                                                                                                    acknowledged_ranges))
+            print("    %s" % checkpoint_journal.get_report())
+
+        inline_time = run_inline(range_count)
+        print("Inline fsync: [ %.2f ] us per range on completion, [ %.3f ] seconds" % (inline_time * 1000000 / range_count, inline_time))
+    finally:
+        shutil.rmtree(checkpoint_dir)
+
+if __name__ == '__main__':
+    main()
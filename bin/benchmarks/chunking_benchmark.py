@@ -0,0 +1,162 @@
+"""
+    Chunking benchmark.
+
+    Counts the lists allocated and the row references copied per million rows,
+    only to size the work units between generation and the session workers. The
+    original re-chunking path (generator batches of db batch size, merged and split
+    again by the batch loading thread, then sliced into 100 row jobs) is compared
+    against the chunk planner, which generates every unit of work in its final size.
+
+    Usage (from the repository root): python -m bin.benchmarks.chunking_benchmark [db_batch_size] [chunk_size]
+
+"""
+import sys
+import time
+
+from bin.executor.chunk_planner import ChunkPlanner
+
+
+ROWS_PER_MILLION = 1000000
+SESSION_JOB_SIZE = 100
+
+
+class AllocationCounter:
+
+    def __init__(self):
+        self.lists_allocated = 0
+        self.rows_copied = 0
+
+    def count(self, rows_copied):
+        self.lists_allocated += 1
+        self.rows_copied += rows_copied
+
+    def get_lists_allocated(self):
+        return self.lists_allocated
+
+    def get_rows_copied(self):
+        return self.rows_copied
+
+
+class LegacyBatchLoadingThread:
+
+    # The original merge and split of the batch loading thread, with every list it
+    # allocates counted; kept here only for comparison
+    def __init__(self, total_num_of_insertion_required, db_batch_size, counter, session_loader):
+        self.total_num_of_insertion_required = total_num_of_insertion_required
+        self.db_batch_size = min(db_batch_size, total_num_of_insertion_required)
+        self.statements_and_params_save_list = []
+        self.counter = counter
+        self.session_loader = session_loader
+
+    def process_and_load(self, data_list):
+        data_list_length = data_list.__len__()
+        current_length = self.statements_and_params_save_list.__len__()
+
+        if data_list_length == self.db_batch_size:
+            self.session_loader(data_list)
+
+        elif data_list_length < self.db_batch_size:
+            to_be_ready_batch_len = data_list_length + current_length
+            if to_be_ready_batch_len < self.db_batch_size:
+                self.statements_and_params_save_list.extend(data_list)
+                self.counter.rows_copied += data_list_length
+
+            elif to_be_ready_batch_len > self.db_batch_size:
+                diff = self.db_batch_size - current_length
+                self.statements_and_params_save_list.extend(data_list[:diff])
+                self.counter.count(2 * diff)
+                self.session_loader(self.statements_and_params_save_list)
+                self.statements_and_params_save_list = data_list[diff:]
+                self.counter.count(data_list_length - diff)
+
+            else:
+                self.statements_and_params_save_list.extend(data_list)
+                self.counter.rows_copied += data_list_length
+                self.session_loader(self.statements_and_params_save_list)
+                self.statements_and_params_save_list[:] = []
+
+        elif data_list_length > self.db_batch_size:
+            head = data_list[:self.db_batch_size]
+            self.counter.count(self.db_batch_size)
+            self.session_loader(head)
+            tail = data_list[self.db_batch_size:]
+            self.counter.count(data_list_length - self.db_batch_size)
+            self.total_num_of_insertion_required -= self.db_batch_size
+            self.process_and_load(tail)
+
+        self.total_num_of_insertion_required -= data_list_length
+        if self.total_num_of_insertion_required == 0 and self.statements_and_params_save_list.__len__() > 0:
+            self.session_loader(self.statements_and_params_save_list)
+            self.statements_and_params_save_list[:] = []
+
+
+def legacy_session_loader(counter):
+    # Every batch was sliced again into 100 row jobs
+    def load(params):
+        for n in xrange(0, params.__len__(), SESSION_JOB_SIZE):
+            job = params[n:n + SESSION_JOB_SIZE]
+            counter.count(job.__len__())
+    return load
+
+
+def run_legacy(generated_sizes, total_rows, db_batch_size):
+    counter = AllocationCounter()
+    batch_loading_thread = LegacyBatchLoadingThread(total_rows, db_batch_size, counter, legacy_session_loader(counter))
+    for generated_size in generated_sizes:
+        batch_loading_thread.process_and_load([None] * generated_size)
+        counter.count(0) # The generated list itself
+    return counter
+
+
+def run_planned(group_sizes, chunk_size):
+    # Every group i.e. every parent for dependents, is planned on its own
+    counter = AllocationCounter()
+    for group_size in group_sizes:
+        for start_offset, end_offset in ChunkPlanner(group_size, chunk_size).get_chunks():
+            [None] * (end_offset - start_offset)
+            counter.count(0) # Generated in its final size; executed by a session worker as it is
+    return counter
+
+
+def get_generated_sizes(total_rows, generated_size):
+    return [end_offset - start_offset for start_offset, end_offset in ChunkPlanner(total_rows, generated_size).get_chunks()]
+
+
+def report(name, counter, total_rows, elapsed_time):
+    scale = float(ROWS_PER_MILLION) / total_rows
+    print("%-36s: [ %10d ] lists, [ %10d ] row references copied per million rows, [ %.3f ] seconds" % (name,
+                                                                                                       counter.get_lists_allocated() * scale,
+                                                                                                       counter.get_rows_copied() * scale,
+                                                                                                       elapsed_time))
+
+
+def measure(name, routine, arguments, total_rows):
+    start_time = time.time()
+    counter = routine(*arguments)
+    report(name, counter, total_rows, time.time() - start_time)
+    return counter
+
+
+def main():
+    db_batch_size = 100000
+    chunk_size = 1000
+    if sys.argv.__len__() > 1:
+        db_batch_size = int(sys.argv[1])
+    if sys.argv.__len__() > 2:
+        chunk_size = int(sys.argv[2])
+
+    print("DB batch size: [ %d ], Chunk size: [ %d ]" % (db_batch_size, chunk_size))
+
+    # Subscribers without dependents; generator batches were of db batch size
+    total_rows = ROWS_PER_MILLION
+    measure("Subscribers, legacy re-chunking", run_legacy, (get_generated_sizes(total_rows, db_batch_size), total_rows, db_batch_size), total_rows)
+    measure("Subscribers, chunk planner", run_planned, ([total_rows], chunk_size), total_rows)
+
+    # Dependents; every parent produced a batch of its 150 dependents
+    parent_count, dependent_count = 6667, 150
+    total_rows = parent_count * dependent_count
+    measure("Dependents, legacy re-chunking", run_legacy, ([dependent_count] * parent_count, total_rows, db_batch_size), total_rows)
+    measure("Dependents, chunk planner", run_planned, ([dependent_count] * parent_count, chunk_size), total_rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+    Engine benchmark.
+
+    Writes the same rows through both execution engines against a local fake session,
+    which completes every request after a fixed latency on its own event loop thread,
+    as the driver does. The pool engine runs chunks in session processes, each one
+    with a bounded number of requests in flight per chunk (as execute_concurrent
+    does); the async engine keeps one budget of requests in flight across chunks,
+    in this process. Both engines get the same number of sessions and the same total
+    of requests in flight: the pool engine splits it evenly over its sessions.
+
+    Usage (from the repository root): python -m bin.benchmarks.engine_benchmark [row_count] [latency_ms] [sessions] [max_in_flight]
+
+"""
+from multiprocessing import Pool
+import Queue
+import heapq
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bin import global_settings
+from bin.commons.configuration_reader import ConfigurationReader
+from bin.dbclient.cassandradb.cassandra_async_engine import CassandraAsyncEngine
+from bin.executor.chunk_planner import ChunkPlanner
+
+
+CHUNK_SIZE = 1000
+SESSION_CONCURRENCY = 100 # Requests in flight per session, unless a total is given
+
+
+class FakeResponseFuture:
+
+    def __init__(self):
+        self.callbacks = None
+
+    def add_callbacks(self, callback, errback, callback_args = (), errback_args = ()):
+        self.callbacks = (callback, callback_args)
+
+    def complete(self):
+        callback, callback_args = self.callbacks
+        callback(None, *callback_args)
+
+
+class FakeSession:
+
+    # Every request completes after the latency; there is no limit on requests in flight
+    def __init__(self, latency):
+        self.latency = latency
+        self.pending = []
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.event_loop_thread = threading.Thread(target=self.__run_event_loop)
+        self.event_loop_thread.setDaemon(True)
+        self.event_loop_thread.start()
+
+    def execute_async(self, statement, params):
+        future = FakeResponseFuture()
+        with self.condition:
+            self.sequence += 1
+            heapq.heappush(self.pending, (time.time() + self.latency, self.sequence, future))
+            self.condition.notify()
+        return future
+
+    def __run_event_loop(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                due_time, _, future = self.pending.__getitem__(0)
+                wait_time = due_time - time.time()
+                if wait_time > 0:
+                    self.condition.wait(wait_time)
+                    continue
+                heapq.heappop(self.pending)
+            # add_callbacks may not have been called yet when the latency is tiny
+            while future.callbacks is None:
+                time.sleep(0)
+            future.complete()
+
+
+def execute_concurrent(session, rows, concurrency):
+    # Same as the driver: up to concurrency requests in flight, returns once all completed
+    window = threading.BoundedSemaphore(concurrency)
+    done_event = threading.Event()
+    remaining = [rows.__len__()]
+    lock = threading.Lock()
+
+    def on_completion(_):
+        window.release()
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done_event.set()
+
+    for row in rows:
+        window.acquire()
+        session.execute_async(None, row).add_callbacks(on_completion, on_completion)
+    done_event.wait()
+    return rows.__len__()
+
+
+fake_session = None
+session_concurrency = None
+
+def setup_pool_worker(latency, concurrency):
+    global fake_session, session_concurrency
+    fake_session = FakeSession(latency)
+    session_concurrency = concurrency
+
+def pool_worker(chunk):
+    return execute_concurrent(fake_session, range(chunk[0], chunk[1]), session_concurrency)
+
+
+def run_pool_engine(chunks, latency, sessions, max_in_flight):
+    session_pool = Pool(processes=sessions, initializer=setup_pool_worker, initargs=(latency, max(1, max_in_flight // sessions)))
+    session_pool.map(pool_worker, chunks[:sessions]) # Warm up; all workers are up
+    start_time = time.time()
+    row_count = sum(session_pool.imap_unordered(pool_worker, chunks))
+    elapsed_time = time.time() - start_time
+    session_pool.close()
+    session_pool.join()
+    return row_count, elapsed_time
+
+
+class BenchmarkQueue(Queue.Queue):
+
+    # Stands in for the batch transport; nothing is checkpointed
+    def complete(self, batch, is_acknowledged):
+        self.task_done()
+
+
+def run_async_engine(chunks, latency, sessions, max_in_flight):
+    batch_queue = BenchmarkQueue()
+    async_engine = CassandraAsyncEngine([FakeSession(latency) for _ in range(sessions)],
+                                        lambda session_index, chunk: [(None, row, 1) for row in xrange(chunk[0], chunk[1])],
+                                        max_in_flight)
+    start_time = time.time()
+    async_engine.start(batch_queue)
+    for chunk in chunks:
+        batch_queue.put(chunk)
+    batch_queue.join()
+    elapsed_time = time.time() - start_time
+    async_engine.stop()
+    print("Async engine %s" % async_engine.get_report())
+    return sum(end_offset - start_offset for start_offset, end_offset in chunks), elapsed_time
+
+
+def report(name, processes, row_count, elapsed_time):
+    print("%-13s: [ %2d ] processes, [ %.3f ] seconds, [ %8.0f ] rows per second" % (name, processes, elapsed_time, row_count / elapsed_time))
+
+
+def main():
+    row_count = 200000
+    latency = 0.002
+    sessions = 4
+    max_in_flight = None
+    if sys.argv.__len__() > 1:
+        row_count = int(sys.argv[1])
+    if sys.argv.__len__() > 2:
+        latency = float(sys.argv[2]) / 1000
+    if sys.argv.__len__() > 3:
+        sessions = int(sys.argv[3])
+    if sys.argv.__len__() > 4:
+        max_in_flight = int(sys.argv[4])
+    if max_in_flight is None:
+        max_in_flight = sessions * SESSION_CONCURRENCY
+
+    # Engine logs go to a temporary file
+    configuration = ConfigurationReader()
+    configuration.loggerFilePath = "/" + os.path.relpath(os.path.join(tempfile.gettempdir(), "engine_benchmark.log"))
+    global_settings.configuration_reader = configuration
+
+    chunks = list(ChunkPlanner(row_count, CHUNK_SIZE).get_chunks())
+    print("Rows: [ %d ], Chunk size: [ %d ], Latency: [ %.1f ] ms, Sessions: [ %d ], Requests in flight: [ %d ]" % (row_count, CHUNK_SIZE, latency * 1000, sessions, max_in_flight))
+    report("Pool engine", sessions + 1, *run_pool_engine(chunks, latency, sessions, max_in_flight))
+    report("Async engine", 1, *run_async_engine(chunks, latency, sessions, max_in_flight))
+
+if __name__ == '__main__':
+    main()
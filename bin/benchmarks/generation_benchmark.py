@@ -0,0 +1,94 @@
+"""
+    Generation benchmark.
+
+    Compares the per-row user number generation path against the vectorized
+    column generation path, for a single subscriber group batch.
+
+    Usage (from the repository root): python -m bin.benchmarks.generation_benchmark [batch_size]
+
+"""
+from collections import OrderedDict
+import sys
+import time
+import uuid
+
+from bin.commons.configuration_reader import ConfigurationReader
+from bin.commons.number_template import NumberTemplate
+from bin.commons.subscriber_data_mapper import SubscriberGroup
+from bin.commons.utils import CommonUtils
+from bin.commons.xml_parser import XMLConstants
+from bin.executor.batch_generator import BatchGeneratorForSubscriberWithoutDependents
+
+
+class BenchmarkKeyJournal:
+
+    def append(self, customer_key_buffer):
+        pass
+
+
+def get_subscriber_group(subscriber_format, place_holder_tag, start_range, end_range):
+    place_holder_map = OrderedDict()
+    place_holder_map[(place_holder_tag, str(end_range).__len__())] = (start_range, end_range)
+    number_template = NumberTemplate.compile(subscriber_format, [(place_holder_tag, str(end_range).__len__(), end_range)])
+    subscriber_info_map = {XMLConstants.XML_NODE_NAME_TAG: XMLConstants.SUBSCRIBERS_TAG,
+                           XMLConstants.TYPE_TAG: XMLConstants.SCENARIO_TYPE_SCREENING_ALLOWED,
+                           XMLConstants.FORMAT_TAG: subscriber_format,
+                           XMLConstants.PLACE_HOLDER_TAG: place_holder_map,
+                           XMLConstants.LIMIT_TAG: str(end_range - start_range + 1),
+                           XMLConstants.NUMBER_TEMPLATE_TAG: number_template,
+                           XMLConstants.SUBSCRIBER_DEPENDENTS: []}
+    return SubscriberGroup(0, subscriber_info_map, False)
+
+
+def get_configuration(batch_size):
+    configuration = ConfigurationReader()
+    configuration.pipelineChunkSize = batch_size
+    return configuration
+
+
+def prepare_per_row(batch_generator):
+    # The original generation path; kept here only for comparison
+    value_list = []
+    place_holder_data = batch_generator.place_holder_data
+    start_range_value = place_holder_data.get_start_range()
+    end_range_value = start_range_value + batch_generator.chunk_size
+    while start_range_value < end_range_value:
+        customer_key = uuid.uuid4()
+        user_number_range_value = CommonUtils.get_padded_number(start_range_value, place_holder_data.get_place_holder_tag_length())
+        updated_subscribers_format = batch_generator.subscriber_format.replace(place_holder_data.get_place_holer_tag(), user_number_range_value)
+        value_list.append((long(updated_subscribers_format), customer_key, None))
+        start_range_value += 1
+    return value_list
+
+
+def prepare_vectorized(batch_generator):
+    batch_generator.chunk_planner.reset()
+    return batch_generator.prepare()
+
+
+def measure(name, routine, argument, batch_size):
+    start_time = time.time()
+    routine(argument)
+    elapsed_time = time.time() - start_time
+    print("%-12s: [ %.3f ] seconds, [ %d ] rows per second." % (name, elapsed_time, batch_size / max(elapsed_time, 1e-9)))
+    return elapsed_time
+
+
+def main():
+    batch_size = 100000
+    if sys.argv.__len__() > 1:
+        batch_size = int(sys.argv[1])
+
+    subscriber_group = get_subscriber_group("1%PLACE_HOLDER%000", "%PLACE_HOLDER%", 100000, 599999)
+    batch_generator = BatchGeneratorForSubscriberWithoutDependents(subscriber_group, get_configuration(batch_size), BenchmarkKeyJournal())
+    if batch_generator.user_number_column_generator is None:
+        print("Subscriber format could not be compiled. Nothing to compare.")
+        return
+
+    print("Batch size: [ %d ], Vectorized (numpy): [ %s ]" % (batch_size, batch_generator.user_number_column_generator.is_vectorized()))
+    per_row_time = measure("Per row", prepare_per_row, batch_generator, batch_size)
+    vectorized_time = measure("Vectorized", prepare_vectorized, batch_generator, batch_size)
+    print("Speed up: [ %.2f ]x" % (per_row_time / max(vectorized_time, 1e-9)))
+
+if __name__ == '__main__':
+    main()
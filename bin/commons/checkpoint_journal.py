@@ -0,0 +1,186 @@
+import os
+import struct
+import threading
+import time
+from Queue import Queue, Empty
+
+from bin.commons.utils import CommonUtils
+from bin.global_settings import TMP_DIR_PATH
+
+
+class RangeCheckpointJournal:
+
+    CHECKPOINT_FILE = TMP_DIR_PATH + "/checkpoint_"
+    FILE_EXTENSION = ".bin"
+
+    # Offsets of a group mean different rows in each scenario, so each has files of its own
+    POPULATION_SCENARIO = "population"
+    DELETION_SCENARIO = "deletion"
+
+    # A range is a (start, end) pair of group offsets
+    RANGE_RECORD = struct.Struct('=qq')
+
+    # Ranges of subscriber groups acknowledged by the driver, appended as packed records
+    # to a file per group. A range is acknowledged once every chunk generated from it,
+    # its dependents as well, is written without a failure. Completion callbacks only
+    # count the chunks; records are written and synced in groups by a writer thread.
+    def __init__(self, scenario, checkpoint_interval):
+        self.scenario = scenario
+        self.checkpoint_interval = checkpoint_interval / 1000.0
+        self.lock = threading.Lock()
+        self.pending_ranges = {} # Chunks still to be completed, and whether all so far were acknowledged
+        self.queue = Queue()
+        self.writer_thread = None
+
+        self.acknowledge_time = 0.0
+        self.ranges_written = 0
+        self.syncs = 0
+        self.write_time = 0.0
+        self.sync_time = 0.0
+        self.max_sync_time = 0.0
+
+    @staticmethod
+    def get_filename(scenario, group_index):
+        return RangeCheckpointJournal.CHECKPOINT_FILE + scenario + "_group_" + group_index.__str__() + RangeCheckpointJournal.FILE_EXTENSION
+
+    def get_scenario(self):
+        return self.scenario
+
+    def discard(self, group_index):
+        # Group is loaded from its first row; ranges of an earlier run are removed
+        filename = RangeCheckpointJournal.get_filename(self.scenario, group_index)
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+    def open(self):
+        self.writer_thread = self.WriterThread(self)
+        self.writer_thread.start()
+
+    def acknowledge(self, checkpoint_tag, is_acknowledged):
+        # Runs on the completion threads; never waits for the disk
+        if checkpoint_tag is None:
+            return
+        start_time = time.time()
+        group_index, start_offset, end_offset, chunk_count = checkpoint_tag
+        with self.lock:
+            if chunk_count > 1:
+                range_key = (group_index, start_offset, end_offset)
+                remaining_chunks, is_range_acknowledged = self.pending_ranges.get(range_key, (chunk_count, True))
+                remaining_chunks -= 1
+                is_acknowledged = is_acknowledged and is_range_acknowledged
+                if remaining_chunks > 0:
+                    self.pending_ranges[range_key] = (remaining_chunks, is_acknowledged)
+                else:
+                    self.pending_ranges.pop(range_key, None)
+            else:
+                remaining_chunks = 0
+            if remaining_chunks == 0 and is_acknowledged:
+                self.queue.put((group_index, start_offset, end_offset))
+            self.acknowledge_time += time.time() - start_time
+
+    def close(self):
+        # Returns once all the acknowledged ranges are on disk
+        if self.writer_thread:
+            self.queue.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
+
+    def get_report(self):
+        average_sync_time = 0.0
+        if self.syncs > 0:
+            average_sync_time = self.sync_time / self.syncs
+        return "Ranges: [ %d ], Incomplete ranges: [ %d ], Syncs: [ %d ], Write time: [ %.3f ] seconds, Sync time (avg / max): [ %.2f / %.2f ] ms, Completion time: [ %.3f ] seconds" % (self.ranges_written,
+                                                                                                                                                                                    self.pending_ranges.__len__(),
+                                                                                                                                                                                    self.syncs,
+                                                                                                                                                                                    self.write_time,
+                                                                                                                                                                                    average_sync_time * 1000,
+                                                                                                                                                                                    self.max_sync_time * 1000,
+                                                                                                                                                                                    self.acknowledge_time)
+
+    class WriterThread(threading.Thread):
+        def __init__(self, checkpoint_journal):
+            threading.Thread.__init__(self)
+            self.setDaemon(True)
+            self.checkpoint_journal = checkpoint_journal
+            self.write_fds = {}
+            self.unsynced_fds = set()
+
+        def run(self):
+            checkpoint_journal = self.checkpoint_journal
+            checkpoint_interval = checkpoint_journal.checkpoint_interval
+            last_sync_time = time.time()
+            try:
+                while True:
+                    try:
+                        acknowledged_range = checkpoint_journal.queue.get(True, max(0, last_sync_time + checkpoint_interval - time.time()))
+                    except Empty:
+                        acknowledged_range = ()
+                    if acknowledged_range is None:
+                        break
+                    if acknowledged_range:
+                        self.__write(acknowledged_range)
+
+                    # Ranges acknowledged within an interval are synced together
+                    if time.time() - last_sync_time >= checkpoint_interval:
+                        self.__checkpoint()
+                        last_sync_time = time.time()
+                self.__checkpoint()
+            except Exception as err:
+                print(err)
+            finally:
+                for write_fd in self.write_fds.itervalues():
+                    write_fd.close()
+
+        def __write(self, acknowledged_range):
+            group_index, start_offset, end_offset = acknowledged_range
+            start_time = time.time()
+            write_fd = self.write_fds.get(group_index)
+            if write_fd is None:
+                write_fd = CommonUtils.open_for_append(RangeCheckpointJournal.get_filename(self.checkpoint_journal.scenario, group_index),
+                                                       RangeCheckpointJournal.RANGE_RECORD.size)
+                self.write_fds[group_index] = write_fd
+            write_fd.write(RangeCheckpointJournal.RANGE_RECORD.pack(start_offset, end_offset))
+            self.unsynced_fds.add(write_fd)
+            self.checkpoint_journal.ranges_written += 1
+            self.checkpoint_journal.write_time += time.time() - start_time
+
+        def __checkpoint(self):
+            if not self.unsynced_fds:
+                return
+            start_time = time.time()
+            for write_fd in self.unsynced_fds:
+                write_fd.flush()
+                os.fsync(write_fd.fileno())
+            self.unsynced_fds.clear()
+            sync_time = time.time() - start_time
+            self.checkpoint_journal.syncs += 1
+            self.checkpoint_journal.write_time += sync_time
+            self.checkpoint_journal.sync_time += sync_time
+            self.checkpoint_journal.max_sync_time = max(self.checkpoint_journal.max_sync_time, sync_time)
+
+
+class RangeCheckpointJournalReader:
+
+    # Ranges of a group acknowledged by earlier runs of a scenario, sorted and merged
+    def __init__(self, scenario):
+        self.scenario = scenario
+
+    def get_acknowledged_ranges(self, group_index):
+        filename = RangeCheckpointJournal.get_filename(self.scenario, group_index)
+        if not os.path.isfile(filename):
+            return []
+
+        # A record cut short by a crash is not read
+        record_size = RangeCheckpointJournal.RANGE_RECORD.size
+        with open(filename, 'rb') as read_fd:
+            records = read_fd.read()
+        acknowledged_ranges = sorted(RangeCheckpointJournal.RANGE_RECORD.unpack_from(records, offset)
+                                     for offset in xrange(0, records.__len__() - record_size + 1, record_size))
+
+        merged_ranges = []
+        for start_offset, end_offset in acknowledged_ranges:
+            if merged_ranges and start_offset <= merged_ranges[-1][1]:
+                merged_ranges[-1] = (merged_ranges[-1][0], max(merged_ranges[-1][1], end_offset))
+            else:
+                merged_ranges.append((start_offset, end_offset))
+        return merged_ranges
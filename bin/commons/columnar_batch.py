@@ -0,0 +1,120 @@
+from array import array
+from itertools import repeat
+import binascii
+import uuid
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Python 2 array has no 'q'; 'l' is 64 bit on the platforms we load from
+INT64_ARRAY_TYPECODE = 'l' if array('l').itemsize == 8 else None
+
+
+class ColumnarBatch:
+
+    # Rows of a chunk, kept column by column in bind order. Numbers are int64
+    # arrays and customer keys one packed 16 byte per row buffer, so a 100k row
+    # chunk is a few MB instead of hundreds of thousands of tuples, longs and UUIDs.
+    # Rows are built only at the driver boundary, by to_rows().
+    INT64_COLUMN = 'q'
+    UUID_COLUMN = 'u'
+    NULL_COLUMN = 'n'
+    OBJECT_COLUMN = 'p'
+
+    UUID_SIZE = 16
+
+    def __init__(self, row_count, columns):
+        self.row_count = row_count
+        self.columns = columns
+
+    def __len__(self):
+        return self.row_count
+
+    def get_row_count(self):
+        return self.row_count
+
+    def get_columns(self):
+        return self.columns
+
+    @staticmethod
+    def int64_column(values):
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            return (ColumnarBatch.INT64_COLUMN, values.astype(numpy.int64))
+        if isinstance(values, array):
+            return (ColumnarBatch.INT64_COLUMN, values)
+        if INT64_ARRAY_TYPECODE is not None:
+            try:
+                return (ColumnarBatch.INT64_COLUMN, array(INT64_ARRAY_TYPECODE, values))
+            except (OverflowError, TypeError):
+                pass # Beyond int64; kept as python numbers
+        return (ColumnarBatch.OBJECT_COLUMN, list(values))
+
+    @staticmethod
+    def uuid_column(uuid_buffer):
+        return (ColumnarBatch.UUID_COLUMN, uuid_buffer)
+
+    @staticmethod
+    def null_column():
+        return (ColumnarBatch.NULL_COLUMN, None)
+
+    @staticmethod
+    def from_rows(rows):
+        # For rows which were not generated column wise e.g. keys read from a file
+        row_count = rows.__len__()
+        if row_count == 0:
+            return ColumnarBatch(0, [])
+        return ColumnarBatch(row_count, [ColumnarBatch.__to_column(column) for column in zip(*rows)])
+
+    @staticmethod
+    def __to_column(column):
+        first_value = column.__getitem__(0)
+        if first_value is None and all(value is None for value in column):
+            return ColumnarBatch.null_column()
+
+        # Columns are homogeneous, as generated; a stray value is kept as it is
+        if isinstance(first_value, uuid.UUID):
+            try:
+                return ColumnarBatch.uuid_column(uuids_to_buffer(column))
+            except AttributeError:
+                pass
+        elif isinstance(first_value, (int, long)):
+            return ColumnarBatch.int64_column(column)
+        return (ColumnarBatch.OBJECT_COLUMN, list(column))
+
+    def to_rows(self):
+        if self.row_count == 0:
+            return []
+        return zip(*[self.__get_values(column_type, data) for column_type, data in self.columns])
+
+    def __get_values(self, column_type, data):
+        if column_type == ColumnarBatch.NULL_COLUMN:
+            return repeat(None, self.row_count)
+        elif column_type == ColumnarBatch.UUID_COLUMN:
+            return buffer_to_uuids(data)
+        elif column_type == ColumnarBatch.INT64_COLUMN:
+            return data.tolist()
+        return data
+
+    def get_size_in_bytes(self):
+        # Payload of the columns only
+        size = 0
+        for column_type, data in self.columns:
+            if column_type == ColumnarBatch.UUID_COLUMN:
+                size += data.__len__()
+            elif column_type == ColumnarBatch.INT64_COLUMN:
+                size += self.row_count * 8
+        return size
+
+
+def uuids_to_buffer(uuid_list):
+    # UUID.bytes is slow; hex of the 128 bit integers is converted in one go
+    return binascii.unhexlify(''.join(['%032x' % value.int for value in uuid_list]))
+
+
+def buffer_to_uuids(uuid_buffer):
+    hex_buffer = binascii.hexlify(uuid_buffer)
+    hex_size = ColumnarBatch.UUID_SIZE * 2
+    return [uuid.UUID(int=int(hex_buffer[index:index + hex_size], 16)) for index in xrange(0, hex_buffer.__len__(), hex_size)]
+
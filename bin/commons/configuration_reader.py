@@ -1,4 +1,5 @@
 import ConfigParser
+import datetime
 import multiprocessing
 
 from utils import CommonUtils
@@ -17,11 +18,34 @@ class ConfigurationReader(object):
     DB_SECTION_TAG = "DB"
     DB_CLUSTER_CONNECTION_POINT_TAG = "dbClusterContactPoints"
     DB_CLUSTER_PROTOCOL_VERSION_TAG = "dbClusterProtocolVersion"
-    DB_BATCH_SIZE_TAG = "dbBatchSize"
+    DB_BATCH_SIZE_TAG = "dbBatchSize" # Deprecated; chunks are sized by pipelineChunkSize
     DB_NO_OF_CONNECTION_POOLS_TAG = "dbNoConnectionOfPools"
     DB_NO_OF_SESSIONS_TAG = "dbNoOfSessions"
     DB_SESSION_CONCURRENCY_TAG = "dbSessionConcurrency"
     DB_DEBUG_STATS_ENABLED_TAG = "dbDebugStatsEnabled"
+    DB_TOKEN_AWARE_ROUTING_TAG = "dbTokenAwareRouting"
+    DB_PARTITION_BATCH_ENABLED_TAG = "dbPartitionBatchEnabled"
+    DB_PARTITION_BATCH_MAX_STATEMENTS_TAG = "dbPartitionBatchMaxStatements"
+    DB_PARTITION_BATCH_MAX_BYTES_TAG = "dbPartitionBatchMaxBytes"
+    DB_ENGINE_TAG = "dbEngine"
+    DB_ASYNC_MAX_IN_FLIGHT_TAG = "dbAsyncMaxInFlight"
+
+    GENERATOR_SECTION_TAG = "GENERATOR"
+    GENERATOR_CUSTOMER_KEY_MODE_TAG = "generatorCustomerKeyMode"
+    GENERATOR_CUSTOMER_KEY_SEED_TAG = "generatorCustomerKeySeed"
+    GENERATOR_TIMESTAMP_MODE_TAG = "generatorTimestampMode"
+    GENERATOR_RUN_TIMESTAMP_TAG = "generatorRunTimestamp"
+
+    PIPELINE_SECTION_TAG = "PIPELINE"
+    PIPELINE_CHUNK_SIZE_TAG = "pipelineChunkSize"
+    PIPELINE_LOADING_QUEUE_CAPACITY_TAG = "pipelineLoadingQueueCapacity"
+    PIPELINE_DEPENDENT_QUEUE_CAPACITY_TAG = "pipelineDependentQueueCapacity"
+    PIPELINE_TRANSPORT_CAPACITY_TAG = "pipelineTransportCapacity"
+    PIPELINE_DISPATCH_WINDOW_TAG = "pipelineDispatchWindow"
+    PIPELINE_SHARD_SIZE_TAG = "pipelineShardSize"
+    PIPELINE_GENERATOR_PROCESSES_TAG = "pipelineGeneratorProcesses"
+    PIPELINE_DEPENDENT_PROCESSES_TAG = "pipelineDependentProcesses"
+    PIPELINE_CHECKPOINT_INTERVAL_TAG = "pipelineCheckpointInterval"
         
     # Default properties values for logging
     DEFAULT_LOGGER_NAME_VALUE = "SkyDBLoader"
@@ -34,11 +58,44 @@ class ConfigurationReader(object):
     # Default properties values for database
     DEFAULT_CLUSTER_CONNECTION_POINT_VALUE = "127.0.0.1"
     DEFAULT_DB_CLUSTER_PROTOCOL_VERSION_VALUE = 3
-    DEFAULT_DB_BATCH_SIZE_VALUE = 200000
     DEFAULT_DB_NO_OF_CONNECTION_POOLS_VALUE = 2
     DEFAULT_DB_NO_OF_SESSIONS_VALUE = (multiprocessing.cpu_count() / 2)
     DEFAULT_DB_DEBUG_STATS_ENABLED_FLAG_VALUE = False
     DEFAULT_DB_SESSION_CONCURRENCY_VALUE = 100
+    DEFAULT_DB_TOKEN_AWARE_ROUTING_FLAG_VALUE = True
+    DEFAULT_DB_PARTITION_BATCH_ENABLED_FLAG_VALUE = False
+    DEFAULT_DB_PARTITION_BATCH_MAX_STATEMENTS_VALUE = 100
+    DEFAULT_DB_PARTITION_BATCH_MAX_BYTES_VALUE = 5120 # Cassandra warns on batches above 5 KB by default
+    DB_POOL_ENGINE = "pool"
+    DB_ASYNC_ENGINE = "async"
+    DB_ENGINES = (DB_POOL_ENGINE, DB_ASYNC_ENGINE)
+    DEFAULT_DB_ENGINE_VALUE = DB_POOL_ENGINE
+    DEFAULT_DB_ASYNC_MAX_IN_FLIGHT_VALUE = 2048
+
+    # Default properties values for generator
+    GENERATOR_CUSTOMER_KEY_RANDOM_MODE = "random"
+    GENERATOR_CUSTOMER_KEY_SEEDED_MODE = "seeded"
+    GENERATOR_CUSTOMER_KEY_MODES = (GENERATOR_CUSTOMER_KEY_RANDOM_MODE, GENERATOR_CUSTOMER_KEY_SEEDED_MODE)
+    DEFAULT_GENERATOR_CUSTOMER_KEY_MODE_VALUE = GENERATOR_CUSTOMER_KEY_RANDOM_MODE
+    DEFAULT_GENERATOR_CUSTOMER_KEY_SEED_VALUE = None
+    GENERATOR_TIMESTAMP_ROW_MODE = "row"
+    GENERATOR_TIMESTAMP_BATCH_MODE = "batch"
+    GENERATOR_TIMESTAMP_MONOTONIC_MODE = "monotonic"
+    GENERATOR_TIMESTAMP_FIXED_MODE = "fixed"
+    GENERATOR_TIMESTAMP_MODES = (GENERATOR_TIMESTAMP_ROW_MODE, GENERATOR_TIMESTAMP_BATCH_MODE, GENERATOR_TIMESTAMP_MONOTONIC_MODE, GENERATOR_TIMESTAMP_FIXED_MODE)
+    DEFAULT_GENERATOR_TIMESTAMP_MODE_VALUE = GENERATOR_TIMESTAMP_BATCH_MODE
+    DEFAULT_GENERATOR_RUN_TIMESTAMP_VALUE = None
+
+    # Default properties values for pipeline
+    DEFAULT_PIPELINE_CHUNK_SIZE_VALUE = 1000
+    DEFAULT_PIPELINE_LOADING_QUEUE_CAPACITY_VALUE = 4
+    DEFAULT_PIPELINE_DEPENDENT_QUEUE_CAPACITY_VALUE = 10000
+    DEFAULT_PIPELINE_TRANSPORT_CAPACITY_VALUE = 200
+    DEFAULT_PIPELINE_DISPATCH_WINDOW_VALUE = 16
+    DEFAULT_PIPELINE_SHARD_SIZE_VALUE = 1000000
+    DEFAULT_PIPELINE_GENERATOR_PROCESSES_VALUE = multiprocessing.cpu_count()
+    DEFAULT_PIPELINE_DEPENDENT_PROCESSES_VALUE = 2
+    DEFAULT_PIPELINE_CHECKPOINT_INTERVAL_VALUE = 1000
     
     def __init__(self):
         self.config = ConfigParser.ConfigParser()
@@ -53,10 +110,28 @@ class ConfigurationReader(object):
         self.dbClusterConnectionPoint = ConfigurationReader.DEFAULT_CLUSTER_CONNECTION_POINT_VALUE
         self.dbClusterProtocolVersion = ConfigurationReader.DEFAULT_DB_CLUSTER_PROTOCOL_VERSION_VALUE
         self.dbNoOfSessions = ConfigurationReader.DEFAULT_DB_NO_OF_SESSIONS_VALUE
-        self.dbBatchSize = ConfigurationReader.DEFAULT_DB_BATCH_SIZE_VALUE 
         self.dbNoOfConnectionPools = ConfigurationReader.DEFAULT_DB_NO_OF_CONNECTION_POOLS_VALUE
         self.dbSessionConcurrency = ConfigurationReader.DEFAULT_DB_SESSION_CONCURRENCY_VALUE
         self.dbDebugStatsEnabled = ConfigurationReader.DEFAULT_DB_DEBUG_STATS_ENABLED_FLAG_VALUE
+        self.dbTokenAwareRouting = ConfigurationReader.DEFAULT_DB_TOKEN_AWARE_ROUTING_FLAG_VALUE
+        self.dbPartitionBatchEnabled = ConfigurationReader.DEFAULT_DB_PARTITION_BATCH_ENABLED_FLAG_VALUE
+        self.dbPartitionBatchMaxStatements = ConfigurationReader.DEFAULT_DB_PARTITION_BATCH_MAX_STATEMENTS_VALUE
+        self.dbPartitionBatchMaxBytes = ConfigurationReader.DEFAULT_DB_PARTITION_BATCH_MAX_BYTES_VALUE
+        self.dbEngine = ConfigurationReader.DEFAULT_DB_ENGINE_VALUE
+        self.dbAsyncMaxInFlight = ConfigurationReader.DEFAULT_DB_ASYNC_MAX_IN_FLIGHT_VALUE
+        self.generatorCustomerKeyMode = ConfigurationReader.DEFAULT_GENERATOR_CUSTOMER_KEY_MODE_VALUE
+        self.generatorCustomerKeySeed = ConfigurationReader.DEFAULT_GENERATOR_CUSTOMER_KEY_SEED_VALUE
+        self.generatorTimestampMode = ConfigurationReader.DEFAULT_GENERATOR_TIMESTAMP_MODE_VALUE
+        self.generatorRunTimestamp = ConfigurationReader.DEFAULT_GENERATOR_RUN_TIMESTAMP_VALUE
+        self.pipelineChunkSize = ConfigurationReader.DEFAULT_PIPELINE_CHUNK_SIZE_VALUE
+        self.pipelineLoadingQueueCapacity = ConfigurationReader.DEFAULT_PIPELINE_LOADING_QUEUE_CAPACITY_VALUE
+        self.pipelineDependentQueueCapacity = ConfigurationReader.DEFAULT_PIPELINE_DEPENDENT_QUEUE_CAPACITY_VALUE
+        self.pipelineTransportCapacity = ConfigurationReader.DEFAULT_PIPELINE_TRANSPORT_CAPACITY_VALUE
+        self.pipelineDispatchWindow = ConfigurationReader.DEFAULT_PIPELINE_DISPATCH_WINDOW_VALUE
+        self.pipelineShardSize = ConfigurationReader.DEFAULT_PIPELINE_SHARD_SIZE_VALUE
+        self.pipelineGeneratorProcesses = ConfigurationReader.DEFAULT_PIPELINE_GENERATOR_PROCESSES_VALUE
+        self.pipelineDependentProcesses = ConfigurationReader.DEFAULT_PIPELINE_DEPENDENT_PROCESSES_VALUE
+        self.pipelineCheckpointInterval = ConfigurationReader.DEFAULT_PIPELINE_CHECKPOINT_INTERVAL_VALUE
         
     def read(self, config_file_name):
         try:
@@ -100,18 +175,9 @@ class ConfigurationReader(object):
                 if self.config.has_option(section, self.DB_CLUSTER_PROTOCOL_VERSION_TAG):
                     self.dbClusterProtocolVersion = self.config.get( section, self.DB_CLUSTER_PROTOCOL_VERSION_TAG)
 
-                # Get DB Batch Size
+                # DB Batch Size no longer sizes anything
                 if self.config.has_option(section, self.DB_BATCH_SIZE_TAG):
-                    batchSize = int(self.config.get(section, self.DB_BATCH_SIZE_TAG))
-                    if not CommonUtils.represent_int(batchSize):
-                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.DB_BATCH_SIZE_TAG, batchSize))
-                        return False
-                    batchSizeIntValue = int(batchSize)
-                    if batchSizeIntValue > int(ConfigurationReader.DEFAULT_DB_BATCH_SIZE_VALUE):
-                        print ("Database batch size cannot be greater than default value: [ %s ]. Using default value..." % ConfigurationReader.DEFAULT_DB_BATCH_SIZE_VALUE)
-                        self.dbBatchSize = ConfigurationReader.DEFAULT_DB_BATCH_SIZE_VALUE
-                    else:
-                        self.dbBatchSize = batchSizeIntValue
+                    print("Property [ %s ] is deprecated and ignored. Rows are written in chunks of [ %s ] rows instead..." % (self.DB_BATCH_SIZE_TAG, self.PIPELINE_CHUNK_SIZE_TAG))
         
                 # Get DB No Of Pools
                 if self.config.has_option(section, self.DB_NO_OF_CONNECTION_POOLS_TAG):
@@ -165,9 +231,181 @@ class ConfigurationReader(object):
                     dbDebugStatsEnabled = self.config.get( section, self.DB_DEBUG_STATS_ENABLED_TAG)
                     if dbDebugStatsEnabled != "False":
                         self.dbDebugStatsEnabled = True
+
+                # Check if rows are routed to their replicas
+                if self.config.has_option(section, self.DB_TOKEN_AWARE_ROUTING_TAG):
+                    dbTokenAwareRouting = self.config.get(section, self.DB_TOKEN_AWARE_ROUTING_TAG)
+                    if dbTokenAwareRouting == "False":
+                        self.dbTokenAwareRouting = False
+
+                # Check if rows of one partition are written as unlogged batches
+                if self.config.has_option(section, self.DB_PARTITION_BATCH_ENABLED_TAG):
+                    dbPartitionBatchEnabled = self.config.get(section, self.DB_PARTITION_BATCH_ENABLED_TAG)
+                    if dbPartitionBatchEnabled != "False":
+                        self.dbPartitionBatchEnabled = True
+
+                # Get Partition Batch Max Statements
+                if self.config.has_option(section, self.DB_PARTITION_BATCH_MAX_STATEMENTS_TAG):
+                    dbPartitionBatchMaxStatements = self.config.get(section, self.DB_PARTITION_BATCH_MAX_STATEMENTS_TAG)
+                    if not CommonUtils.represent_int(dbPartitionBatchMaxStatements) or int(dbPartitionBatchMaxStatements) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.DB_PARTITION_BATCH_MAX_STATEMENTS_TAG, dbPartitionBatchMaxStatements))
+                        return False
+                    self.dbPartitionBatchMaxStatements = int(dbPartitionBatchMaxStatements)
+
+                # Get Partition Batch Max Bytes
+                if self.config.has_option(section, self.DB_PARTITION_BATCH_MAX_BYTES_TAG):
+                    dbPartitionBatchMaxBytes = self.config.get(section, self.DB_PARTITION_BATCH_MAX_BYTES_TAG)
+                    if not CommonUtils.represent_int(dbPartitionBatchMaxBytes) or int(dbPartitionBatchMaxBytes) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.DB_PARTITION_BATCH_MAX_BYTES_TAG, dbPartitionBatchMaxBytes))
+                        return False
+                    self.dbPartitionBatchMaxBytes = int(dbPartitionBatchMaxBytes)
+
+                # Get Engine
+                if self.config.has_option(section, self.DB_ENGINE_TAG):
+                    dbEngine = self.config.get(section, self.DB_ENGINE_TAG).strip()
+                    if dbEngine not in ConfigurationReader.DB_ENGINES:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.DB_ENGINE_TAG, dbEngine))
+                        return False
+                    self.dbEngine = dbEngine
+
+                # Get Async Max In Flight
+                if self.config.has_option(section, self.DB_ASYNC_MAX_IN_FLIGHT_TAG):
+                    dbAsyncMaxInFlight = self.config.get(section, self.DB_ASYNC_MAX_IN_FLIGHT_TAG)
+                    if not CommonUtils.represent_int(dbAsyncMaxInFlight) or int(dbAsyncMaxInFlight) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.DB_ASYNC_MAX_IN_FLIGHT_TAG, dbAsyncMaxInFlight))
+                        return False
+                    self.dbAsyncMaxInFlight = int(dbAsyncMaxInFlight)
+
+            # Check and update generator properties
+            if section == self.GENERATOR_SECTION_TAG:
+
+                # Get Customer Key Mode
+                if self.config.has_option(section, self.GENERATOR_CUSTOMER_KEY_MODE_TAG):
+                    generatorCustomerKeyMode = self.config.get(section, self.GENERATOR_CUSTOMER_KEY_MODE_TAG).strip()
+                    if generatorCustomerKeyMode not in ConfigurationReader.GENERATOR_CUSTOMER_KEY_MODES:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.GENERATOR_CUSTOMER_KEY_MODE_TAG, generatorCustomerKeyMode))
+                        return False
+                    self.generatorCustomerKeyMode = generatorCustomerKeyMode
+
+                # Get Customer Key Seed
+                if self.config.has_option(section, self.GENERATOR_CUSTOMER_KEY_SEED_TAG):
+                    generatorCustomerKeySeed = self.config.get(section, self.GENERATOR_CUSTOMER_KEY_SEED_TAG).strip()
+                    if generatorCustomerKeySeed.__len__() > 0:
+                        self.generatorCustomerKeySeed = generatorCustomerKeySeed
+
+                # Get Timestamp Mode
+                if self.config.has_option(section, self.GENERATOR_TIMESTAMP_MODE_TAG):
+                    generatorTimestampMode = self.config.get(section, self.GENERATOR_TIMESTAMP_MODE_TAG).strip()
+                    if generatorTimestampMode not in ConfigurationReader.GENERATOR_TIMESTAMP_MODES:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.GENERATOR_TIMESTAMP_MODE_TAG, generatorTimestampMode))
+                        return False
+                    self.generatorTimestampMode = generatorTimestampMode
+
+                # Get Run Timestamp; epoch milliseconds
+                if self.config.has_option(section, self.GENERATOR_RUN_TIMESTAMP_TAG):
+                    generatorRunTimestamp = self.config.get(section, self.GENERATOR_RUN_TIMESTAMP_TAG).strip()
+                    if generatorRunTimestamp.__len__() > 0:
+                        if not CommonUtils.represent_int(generatorRunTimestamp):
+                            print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.GENERATOR_RUN_TIMESTAMP_TAG, generatorRunTimestamp))
+                            return False
+                        self.generatorRunTimestamp = long(generatorRunTimestamp)
+
+            # Check and update pipeline properties
+            if section == self.PIPELINE_SECTION_TAG:
+
+                # Get Chunk Size
+                if self.config.has_option(section, self.PIPELINE_CHUNK_SIZE_TAG):
+                    pipelineChunkSize = self.config.get(section, self.PIPELINE_CHUNK_SIZE_TAG)
+                    if not CommonUtils.represent_int(pipelineChunkSize) or int(pipelineChunkSize) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_CHUNK_SIZE_TAG, pipelineChunkSize))
+                        return False
+                    self.pipelineChunkSize = int(pipelineChunkSize)
+
+                # Get Queue Capacities; 0 means unbounded
+                if self.config.has_option(section, self.PIPELINE_LOADING_QUEUE_CAPACITY_TAG):
+                    pipelineLoadingQueueCapacity = self.config.get(section, self.PIPELINE_LOADING_QUEUE_CAPACITY_TAG)
+                    if not CommonUtils.represent_int(pipelineLoadingQueueCapacity) or int(pipelineLoadingQueueCapacity) < 0:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_LOADING_QUEUE_CAPACITY_TAG, pipelineLoadingQueueCapacity))
+                        return False
+                    self.pipelineLoadingQueueCapacity = int(pipelineLoadingQueueCapacity)
+
+                if self.config.has_option(section, self.PIPELINE_DEPENDENT_QUEUE_CAPACITY_TAG):
+                    pipelineDependentQueueCapacity = self.config.get(section, self.PIPELINE_DEPENDENT_QUEUE_CAPACITY_TAG)
+                    if not CommonUtils.represent_int(pipelineDependentQueueCapacity) or int(pipelineDependentQueueCapacity) < 0:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_DEPENDENT_QUEUE_CAPACITY_TAG, pipelineDependentQueueCapacity))
+                        return False
+                    self.pipelineDependentQueueCapacity = int(pipelineDependentQueueCapacity)
+
+                if self.config.has_option(section, self.PIPELINE_TRANSPORT_CAPACITY_TAG):
+                    pipelineTransportCapacity = self.config.get(section, self.PIPELINE_TRANSPORT_CAPACITY_TAG)
+                    if not CommonUtils.represent_int(pipelineTransportCapacity) or int(pipelineTransportCapacity) < 0:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_TRANSPORT_CAPACITY_TAG, pipelineTransportCapacity))
+                        return False
+                    self.pipelineTransportCapacity = int(pipelineTransportCapacity)
+
+                # Get Dispatch Window; chunks in flight per session pool
+                if self.config.has_option(section, self.PIPELINE_DISPATCH_WINDOW_TAG):
+                    pipelineDispatchWindow = self.config.get(section, self.PIPELINE_DISPATCH_WINDOW_TAG)
+                    if not CommonUtils.represent_int(pipelineDispatchWindow) or int(pipelineDispatchWindow) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_DISPATCH_WINDOW_TAG, pipelineDispatchWindow))
+                        return False
+                    self.pipelineDispatchWindow = int(pipelineDispatchWindow)
+
+                # Get Shard Size; subscribers generated by one process at most
+                if self.config.has_option(section, self.PIPELINE_SHARD_SIZE_TAG):
+                    pipelineShardSize = self.config.get(section, self.PIPELINE_SHARD_SIZE_TAG)
+                    if not CommonUtils.represent_int(pipelineShardSize) or int(pipelineShardSize) < 0:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_SHARD_SIZE_TAG, pipelineShardSize))
+                        return False
+                    self.pipelineShardSize = int(pipelineShardSize)
+
+                # Get Generator Processes
+                if self.config.has_option(section, self.PIPELINE_GENERATOR_PROCESSES_TAG):
+                    pipelineGeneratorProcesses = self.config.get(section, self.PIPELINE_GENERATOR_PROCESSES_TAG)
+                    if not CommonUtils.represent_int(pipelineGeneratorProcesses) or int(pipelineGeneratorProcesses) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_GENERATOR_PROCESSES_TAG, pipelineGeneratorProcesses))
+                        return False
+                    self.pipelineGeneratorProcesses = int(pipelineGeneratorProcesses)
+
+                # Get Dependent Processes
+                if self.config.has_option(section, self.PIPELINE_DEPENDENT_PROCESSES_TAG):
+                    pipelineDependentProcesses = self.config.get(section, self.PIPELINE_DEPENDENT_PROCESSES_TAG)
+                    if not CommonUtils.represent_int(pipelineDependentProcesses) or int(pipelineDependentProcesses) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_DEPENDENT_PROCESSES_TAG, pipelineDependentProcesses))
+                        return False
+                    self.pipelineDependentProcesses = int(pipelineDependentProcesses)
+
+                # Get Checkpoint Interval
+                if self.config.has_option(section, self.PIPELINE_CHECKPOINT_INTERVAL_TAG):
+                    pipelineCheckpointInterval = self.config.get(section, self.PIPELINE_CHECKPOINT_INTERVAL_TAG)
+                    if not CommonUtils.represent_int(pipelineCheckpointInterval) or int(pipelineCheckpointInterval) < 1:
+                        print("Invalid property [ %s ] value: [ %s ]. Exiting Database Loader..." % (self.PIPELINE_CHECKPOINT_INTERVAL_TAG, pipelineCheckpointInterval))
+                        return False
+                    self.pipelineCheckpointInterval = int(pipelineCheckpointInterval)
+
+        # Seeded customer keys cannot be derived without a seed
+        if self.generatorCustomerKeyMode == ConfigurationReader.GENERATOR_CUSTOMER_KEY_SEEDED_MODE and self.generatorCustomerKeySeed is None:
+            print("Property [ %s ] is required when [ %s ] is seeded. Exiting Database Loader..." % (self.GENERATOR_CUSTOMER_KEY_SEED_TAG, self.GENERATOR_CUSTOMER_KEY_MODE_TAG))
+            return False
+
+        # Run timestamp is taken once, so that it is same for all the processes
+        if self.generatorRunTimestamp is None:
+            self.generatorRunTimestamp = CommonUtils.unix_time_millis(datetime.datetime.now())
                         
         # Configuration read successfully...
         return True
+
+    def freeze(self):
+        # Only the parsed values are kept, read only from here on. Processes get a copy
+        # of it when they are spawned, so that a getter is never a call to another process.
+        self.config = None
+        self.frozen = True
+        return self
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('frozen'):
+            raise AttributeError("Configuration is frozen, property [ %s ] cannot be changed." % name)
+        object.__setattr__(self, name, value)
     
     # Properties Getters
     def get_logger_name(self):
@@ -197,9 +435,6 @@ class ConfigurationReader(object):
     def get_db_no_of_sessions(self):
         return self.dbNoOfSessions
     
-    def get_db_batch_size(self):
-        return self.dbBatchSize
-    
     def get_db_no_of_connection_pools(self):
         return self.dbNoOfConnectionPools
     
@@ -207,4 +442,61 @@ class ConfigurationReader(object):
         return self.dbSessionConcurrency
        
     def is_debug_stats_enabled(self):
-        return self.dbDebugStatsEnabled
\ No newline at end of file
+        return self.dbDebugStatsEnabled
+
+    def is_token_aware_routing_enabled(self):
+        return self.dbTokenAwareRouting
+
+    def is_partition_batch_enabled(self):
+        return self.dbPartitionBatchEnabled
+
+    def get_db_partition_batch_max_statements(self):
+        return self.dbPartitionBatchMaxStatements
+
+    def get_db_partition_batch_max_bytes(self):
+        return self.dbPartitionBatchMaxBytes
+
+    def get_db_engine(self):
+        return self.dbEngine
+
+    def get_db_async_max_in_flight(self):
+        return self.dbAsyncMaxInFlight
+
+    def get_generator_customer_key_mode(self):
+        return self.generatorCustomerKeyMode
+
+    def get_generator_customer_key_seed(self):
+        return self.generatorCustomerKeySeed
+
+    def get_generator_timestamp_mode(self):
+        return self.generatorTimestampMode
+
+    def get_generator_run_timestamp(self):
+        return self.generatorRunTimestamp
+
+    def get_pipeline_chunk_size(self):
+        return self.pipelineChunkSize
+
+    def get_pipeline_loading_queue_capacity(self):
+        return self.pipelineLoadingQueueCapacity
+
+    def get_pipeline_dependent_queue_capacity(self):
+        return self.pipelineDependentQueueCapacity
+
+    def get_pipeline_transport_capacity(self):
+        return self.pipelineTransportCapacity
+
+    def get_pipeline_dispatch_window(self):
+        return self.pipelineDispatchWindow
+
+    def get_pipeline_shard_size(self):
+        return self.pipelineShardSize
+
+    def get_pipeline_generator_processes(self):
+        return self.pipelineGeneratorProcesses
+
+    def get_pipeline_dependent_processes(self):
+        return self.pipelineDependentProcesses
+
+    def get_pipeline_checkpoint_interval(self):
+        return self.pipelineCheckpointInterval
\ No newline at end of file
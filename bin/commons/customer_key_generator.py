@@ -0,0 +1,86 @@
+import binascii
+import hashlib
+import os
+import uuid
+
+from bin.commons.configuration_reader import ConfigurationReader
+
+# Keys are packed 16 byte per key, in uuid.UUID.bytes order. Version nibble is byte
+# 6 and RFC 4122 variant bits are in byte 8; both are set for all the keys of a
+# buffer at once, by translating every 16th byte.
+VERSION_BYTE_INDEX = 6
+VARIANT_BYTE_INDEX = 8
+VARIANT_TABLE = str(bytearray((byte & 0x3f) | 0x80 for byte in xrange(256)))
+
+
+def get_version_table(version):
+    return str(bytearray((byte & 0x0f) | (version << 4) for byte in xrange(256)))
+
+
+def set_version_and_variant(key_buffer, version_table):
+    key_buffer = bytearray(key_buffer)
+    key_buffer[VERSION_BYTE_INDEX::16] = key_buffer[VERSION_BYTE_INDEX::16].translate(version_table)
+    key_buffer[VARIANT_BYTE_INDEX::16] = key_buffer[VARIANT_BYTE_INDEX::16].translate(VARIANT_TABLE)
+    return str(key_buffer)
+
+
+class CustomerKeyGeneratorFactory:
+
+    @staticmethod
+    def get_customer_key_generator(configuration):
+        if configuration.get_generator_customer_key_mode() == ConfigurationReader.GENERATOR_CUSTOMER_KEY_SEEDED_MODE:
+            return SeededCustomerKeyGenerator(configuration.get_generator_customer_key_seed())
+        return RandomCustomerKeyGenerator()
+
+
+class RandomCustomerKeyGenerator:
+
+    # Version 4 and RFC 4122 variant bits, same as set by uuid.uuid4()
+    VERSION_TABLE = get_version_table(4)
+
+    # Instead of reading os.urandom once per key, randomness for the whole batch
+    # is pulled in a single call; keys stay packed, no UUID is created at all.
+    def get_customer_key_buffer(self, user_number_list):
+        return set_version_and_variant(os.urandom(16 * user_number_list.__len__()), RandomCustomerKeyGenerator.VERSION_TABLE)
+
+    def is_deterministic(self):
+        return False
+
+
+class SeededCustomerKeyGenerator:
+
+    # Version 3 and RFC 4122 variant bits, same as set by uuid.uuid3()
+    VERSION_CLEAR_MASK = ~((0xc000 << 48) | (0xf000 << 64))
+    VERSION_SET_BITS = (0x8000 << 48) | (3 << 76)
+    VERSION_TABLE = get_version_table(3)
+
+    # Customer key is derived from the user number and the run seed; it is same
+    # as uuid.uuid3(get_namespace(), str(user_number)). So, the keys of a repeated
+    # load are reproducible and can be recomputed rather than stored.
+    def __init__(self, seed):
+        self.seed = seed
+        self.namespace = SeededCustomerKeyGenerator.get_namespace(seed)
+        self.namespace_hash = hashlib.md5(self.namespace.bytes)
+
+    @staticmethod
+    def get_namespace(seed):
+        return uuid.uuid5(uuid.NAMESPACE_OID, "cassandra-db-loader:%s" % seed)
+
+    def get_customer_key(self, user_number):
+        user_number_hash = self.namespace_hash.copy()
+        user_number_hash.update(str(user_number))
+        value = int(binascii.hexlify(user_number_hash.digest()), 16)
+        return uuid.UUID(int=(value & SeededCustomerKeyGenerator.VERSION_CLEAR_MASK) | SeededCustomerKeyGenerator.VERSION_SET_BITS)
+
+    def get_customer_key_buffer(self, user_number_list):
+        # MD5 digest is the uuid3 bytes; only the version and variant bits differ
+        namespace_hash = self.namespace_hash
+        digests = []
+        for user_number in user_number_list:
+            user_number_hash = namespace_hash.copy()
+            user_number_hash.update(str(user_number))
+            digests.append(user_number_hash.digest())
+        return set_version_and_variant(''.join(digests), SeededCustomerKeyGenerator.VERSION_TABLE)
+
+    def is_deterministic(self):
+        return True
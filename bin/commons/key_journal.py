@@ -0,0 +1,209 @@
+import glob
+import mmap
+import os
+import threading
+import uuid
+from itertools import islice
+from Queue import Queue, Full
+
+from bin.commons.columnar_batch import ColumnarBatch, uuids_to_buffer
+from bin.commons.utils import CommonUtils
+from bin.global_settings import TMP_DIR_PATH
+
+
+class CustomerKeyJournal:
+
+    CUSTOMER_KEY_FILE = TMP_DIR_PATH + "/customer_keys_for_subscriber_type_"
+    FILE_EXTENSION = ".bin"
+
+    # Buffers of keys waiting for the writer; generation blocks only beyond this
+    QUEUE_CAPACITY = 64
+
+    # Written keys are synced to disk every so many bytes, and when closed
+    CHECKPOINT_BYTES = 16 * 1024 * 1024
+
+    # Keys saved by earlier versions, one uuid per line of a text file per subscriber type
+    LEGACY_CUSTOMER_KEY_FILE = TMP_DIR_PATH + "/saved_customer_keys_for_subscriber_type_"
+    LEGACY_FILE_EXTENSION = ".txt"
+    LEGACY_SHARD_NAME = "group_legacy"
+    LEGACY_CONVERSION_LINES = 100000
+
+    # Customer keys of a group, or of a shard of it, as packed 16 byte records appended
+    # to a file of its own, named after the group index. Buffers are handed over to a
+    # writer thread as generated, so neither the memory nor the time of the generation
+    # loop grows with the keys saved.
+    def __init__(self, subscriber_type, subscriber_group_index, shard_name = None):
+        self.filename = CustomerKeyJournal.get_filename(subscriber_type, subscriber_group_index, shard_name)
+        self.queue = Queue(CustomerKeyJournal.QUEUE_CAPACITY)
+        self.writer_thread = None
+        self.writer_error = None
+        self.bytes_written = 0
+        self.bytes_synced = 0
+
+    @staticmethod
+    def get_filename(subscriber_type, subscriber_group_index, shard_name = None):
+        # Shard names start with the group index already
+        if shard_name is None:
+            shard_name = "group_%s" % subscriber_group_index
+        return CustomerKeyJournal.CUSTOMER_KEY_FILE + subscriber_type.__str__() + "_" + shard_name + CustomerKeyJournal.FILE_EXTENSION
+
+    @staticmethod
+    def discard(subscriber_type, subscriber_group_index):
+        # Group is loaded from its first row; keys saved by an earlier run are removed,
+        # whichever shard size it was split with
+        filenames = [CustomerKeyJournal.get_filename(subscriber_type, subscriber_group_index)]
+        filenames.extend(glob.glob(CustomerKeyJournal.get_filename(subscriber_type, subscriber_group_index, "group_%s_shard_*" % subscriber_group_index)))
+        for filename in filenames:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    @staticmethod
+    def convert_legacy_file(subscriber_type):
+        # Converted once, into a key file of its own read along with the ones of the groups;
+        # returns the keys converted. The text file is left as it is.
+        legacy_filename = CustomerKeyJournal.LEGACY_CUSTOMER_KEY_FILE + subscriber_type.__str__() + CustomerKeyJournal.LEGACY_FILE_EXTENSION
+        filename = CustomerKeyJournal.get_filename(subscriber_type, None, CustomerKeyJournal.LEGACY_SHARD_NAME)
+        if not os.path.isfile(legacy_filename) or os.path.isfile(filename):
+            return 0
+
+        # Renamed once complete, so that a conversion cut short is done again
+        key_count = 0
+        with open(legacy_filename, 'rb') as read_fd:
+            with open(filename + ".tmp", 'wb') as write_fd:
+                lines = (line.strip() for line in read_fd)
+                while True:
+                    customer_keys = [uuid.UUID(line) for line in islice(lines, CustomerKeyJournal.LEGACY_CONVERSION_LINES) if line]
+                    if not customer_keys:
+                        break
+                    write_fd.write(uuids_to_buffer(customer_keys))
+                    key_count += customer_keys.__len__()
+                write_fd.flush()
+                os.fsync(write_fd.fileno())
+        os.rename(filename + ".tmp", filename)
+        return key_count
+
+    def open(self, resume = False):
+        # Keys of an earlier run of the group are replaced, unless the run is resumed
+        if resume:
+            write_fd = CommonUtils.open_for_append(self.filename, ColumnarBatch.UUID_SIZE)
+        else:
+            write_fd = open(self.filename, 'wb')
+        self.writer_thread = self.WriterThread(self, write_fd)
+        self.writer_thread.start()
+
+    def append(self, customer_key_buffer):
+        self.__put(customer_key_buffer)
+
+    def close(self):
+        # Returns once all the keys appended are on disk; raises when they could not be written
+        if self.writer_thread:
+            try:
+                self.__put(None)
+                self.writer_thread.join()
+            finally:
+                self.writer_thread = None
+            self.__check_writer()
+
+    def __put(self, item):
+        # Nobody takes from the queue once the writer is gone, so it is never waited on for long
+        while True:
+            self.__check_writer()
+            try:
+                self.queue.put(item, True, 1)
+                return
+            except Full:
+                pass
+
+    def __check_writer(self):
+        if self.writer_error is not None:
+            raise CustomerKeyJournalException("Failed to save customer keys to [ %s ]. Error: [ %s ]" % (self.filename, self.writer_error))
+        if self.writer_thread and not self.writer_thread.is_alive():
+            raise CustomerKeyJournalException("Writer of customer keys to [ %s ] has stopped." % self.filename)
+
+    def get_bytes_written(self):
+        return self.bytes_written
+
+    def get_bytes_synced(self):
+        return self.bytes_synced
+
+    class WriterThread(threading.Thread):
+        def __init__(self, customer_key_journal, write_fd):
+            threading.Thread.__init__(self)
+            self.setDaemon(True)
+            self.customer_key_journal = customer_key_journal
+            self.write_fd = write_fd
+
+        def run(self):
+            customer_key_journal = self.customer_key_journal
+            try:
+                while True:
+                    customer_key_buffer = customer_key_journal.queue.get()
+                    if customer_key_buffer is None:
+                        break
+                    self.write_fd.write(customer_key_buffer)
+                    customer_key_journal.bytes_written += customer_key_buffer.__len__()
+                    if customer_key_journal.bytes_written - customer_key_journal.bytes_synced >= CustomerKeyJournal.CHECKPOINT_BYTES:
+                        self.__checkpoint()
+                self.__checkpoint()
+            except Exception as err:
+                # Raised to the generation loop on its next append, or on close
+                customer_key_journal.writer_error = err
+            finally:
+                self.write_fd.close()
+
+        def __checkpoint(self):
+            self.write_fd.flush()
+            os.fsync(self.write_fd.fileno())
+            self.customer_key_journal.bytes_synced = self.customer_key_journal.bytes_written
+
+
+class CustomerKeyJournalReader:
+
+    # Keys saved for a subscriber type i.e. from the files of its groups and of their
+    # shards, and the ones converted from earlier versions. Files are memory mapped; keys
+    # are read a chunk at a time, as packed buffers.
+    def __init__(self, subscriber_type):
+        self.filenames = sorted(glob.glob(CustomerKeyJournal.CUSTOMER_KEY_FILE + subscriber_type.__str__() + "_group_*" + CustomerKeyJournal.FILE_EXTENSION))
+
+    def get_filenames(self):
+        return self.filenames
+
+    def get_key_count(self):
+        # A record cut short by a crash is not counted
+        return sum(self.__get_file_key_count(filename) for filename in self.filenames)
+
+    def get_chunks(self, chunk_size, start_key = 0, end_key = None):
+        # Packed buffers of up to chunk size keys, in the key range; keys of the files
+        # are numbered one after the other, in the order of the files
+        chunk_bytes = chunk_size * ColumnarBatch.UUID_SIZE
+        file_start_key = 0
+        for filename in self.filenames:
+            file_key_count = self.__get_file_key_count(filename)
+            file_end_key = file_start_key + file_key_count
+            if end_key is not None and file_start_key >= end_key:
+                break
+
+            first_key = max(start_key, file_start_key) - file_start_key
+            last_key = file_key_count
+            if end_key is not None:
+                last_key = min(end_key, file_end_key) - file_start_key
+            file_start_key = file_end_key
+            if first_key >= last_key:
+                continue
+
+            with open(filename, 'rb') as read_fd:
+                key_map = mmap.mmap(read_fd.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    end_offset = last_key * ColumnarBatch.UUID_SIZE
+                    for start_offset in xrange(first_key * ColumnarBatch.UUID_SIZE, end_offset, chunk_bytes):
+                        yield key_map[start_offset:min(start_offset + chunk_bytes, end_offset)]
+                finally:
+                    key_map.close()
+
+    @staticmethod
+    def __get_file_key_count(filename):
+        return os.path.getsize(filename) // ColumnarBatch.UUID_SIZE
+
+
+class CustomerKeyJournalException(Exception):
+    pass
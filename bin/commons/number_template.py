@@ -0,0 +1,88 @@
+import re
+
+
+class NumberTemplate:
+
+    # Largest value which can be stored in a cassandra bigint column
+    INT64_MAX_VALUE = (1 << 63) - 1
+
+    # A subscriber format like "1%PLACE_HOLDER%000" is nothing but
+    # prefix * 10^(k + m) + range_value * 10^m + suffix. So once compiled, a user
+    # number can be produced with integer math instead of string replacement.
+    # Every place holder gets its own multiplier, and dependent formats like
+    # "1_INHERIT_%PLACE_HOLDER%" get one more term for the inherited range value.
+    def __init__(self, offset, multipliers, inherit_multiplier, max_value):
+        self.offset = offset
+        self.multipliers = multipliers
+        self.inherit_multiplier = inherit_multiplier
+        self.max_value = max_value
+
+    def get_offset(self):
+        return self.offset
+
+    def get_multipliers(self):
+        return self.multipliers
+
+    def get_inherit_multiplier(self):
+        return self.inherit_multiplier
+
+    def get_max_value(self):
+        return self.max_value
+
+    def fits_int64(self):
+        return self.max_value <= NumberTemplate.INT64_MAX_VALUE
+
+    def get_inherited_offset(self, inherited_range_value):
+        return self.offset + inherited_range_value * self.inherit_multiplier
+
+    def get_value(self, range_values, inherited_range_value = 0):
+        value = self.offset + inherited_range_value * self.inherit_multiplier
+        for range_value, multiplier in zip(range_values, self.multipliers):
+            value += range_value * multiplier
+        return value
+
+    # Place holders are given as (tag, tag length, end range value) tuples. Returns
+    # None, when format cannot be expressed numerically. In that case caller has to
+    # fall back on string replacement.
+    @staticmethod
+    def compile(subscriber_format, place_holders, inherit_tag = None, inherit_tag_length = 0, inherit_end_range_value = 0):
+        if subscriber_format is None or not place_holders:
+            return None
+
+        tag_length_map = {}
+        for place_holder_tag, place_holder_tag_length, _ in place_holders:
+            tag_length_map[place_holder_tag] = place_holder_tag_length
+        if inherit_tag is not None and subscriber_format.__contains__(inherit_tag):
+            tag_length_map[inherit_tag] = inherit_tag_length
+
+        # Splitting with a capturing group keeps tags in the resulting list
+        search_regex = "(" + "|".join(re.escape(tag) for tag in tag_length_map) + ")"
+        format_parts = re.split(search_regex, subscriber_format)
+
+        offset = 0
+        multiplier_map = {}
+        power = 0
+        for format_part in reversed(format_parts):
+            if tag_length_map.__contains__(format_part):
+                # Each tag is allowed only once in the numeric form
+                if multiplier_map.__contains__(format_part):
+                    return None
+                multiplier_map[format_part] = 10 ** power
+                power += tag_length_map[format_part]
+            elif format_part.__len__() > 0:
+                if not format_part.isdigit():
+                    return None
+                offset += long(format_part) * 10 ** power
+                power += format_part.__len__()
+
+        multipliers = []
+        max_value = offset
+        for place_holder_tag, _, end_range_value in place_holders:
+            if not multiplier_map.__contains__(place_holder_tag):
+                return None
+            multipliers.append(multiplier_map[place_holder_tag])
+            max_value += end_range_value * multiplier_map[place_holder_tag]
+
+        inherit_multiplier = multiplier_map.get(inherit_tag, 0)
+        max_value += inherit_end_range_value * inherit_multiplier
+        return NumberTemplate(offset, multipliers, inherit_multiplier, max_value)
@@ -0,0 +1,64 @@
+class PlaceHolderSpace:
+
+    # Cartesian product of all place holder ranges of a format, walked in mixed
+    # radix order i.e. first place holder is the most significant and the last one
+    # changes fastest. Every combination has a linear offset in [0, size), so any
+    # offset range can be generated on its own without building the product.
+    def __init__(self, place_holder_data_list):
+        self.place_holder_data_list = place_holder_data_list
+        self.start_values = [place_holder_data.get_start_range() for place_holder_data in place_holder_data_list]
+        self.end_values = [place_holder_data.get_end_range() for place_holder_data in place_holder_data_list]
+        self.radices = [end_value - start_value for start_value, end_value in zip(self.start_values, self.end_values)]
+
+        self.strides = []
+        stride = 1
+        for radix in reversed(self.radices):
+            self.strides.insert(0, stride)
+            stride *= radix
+        self.size = stride
+
+    def get_place_holder_data_list(self):
+        return self.place_holder_data_list
+
+    def get_dimension(self):
+        return self.radices.__len__()
+
+    def get_size(self):
+        return self.size
+
+    def get_start_values(self):
+        return self.start_values
+
+    def get_radices(self):
+        return self.radices
+
+    def get_strides(self):
+        return self.strides
+
+    def get_range_values(self, offset):
+        range_values = []
+        for start_value, radix, stride in zip(self.start_values, self.radices, self.strides):
+            range_values.append(start_value + (offset // stride) % radix)
+        return tuple(range_values)
+
+    def get_leading_range_values(self, start_offset, stop_offset):
+        # Values of the first place holder only
+        start_value = self.start_values[0]
+        radix = self.radices[0]
+        stride = self.strides[0]
+        return [start_value + (offset // stride) % radix for offset in xrange(start_offset, stop_offset)]
+
+    def iterate(self, start_offset, stop_offset):
+        # Lazily yields range value tuples; only the first one is computed by division
+        range_values = list(self.get_range_values(start_offset))
+        last_index = range_values.__len__() - 1
+        for _ in xrange(stop_offset - start_offset):
+            yield tuple(range_values)
+
+            index = last_index
+            while index >= 0:
+                range_values[index] += 1
+                if range_values[index] < self.end_values[index]:
+                    break
+                range_values[index] = self.start_values[index]
+                index -= 1
@@ -0,0 +1,35 @@
+import multiprocessing
+import os
+
+# Events created by this process; forked processes inherit them
+_event_registry = {}
+
+
+class SharedEvent:
+
+    # Event shared with forked processes, without a manager process to serve it.
+    # Semaphores cannot be pickled, so the event must be created before the processes
+    # are forked; pickling it, e.g. in the arguments of a pool task, carries only its
+    # registry id.
+    def __init__(self):
+        self.event_id = "%d-%d" % (os.getpid(), _event_registry.__len__())
+        self.event = multiprocessing.Event()
+        _event_registry[self.event_id] = self
+
+    def __getstate__(self):
+        return {'event_id': self.event_id}
+
+    def __setstate__(self, state):
+        self.__dict__.update(_event_registry[state['event_id']].__dict__)
+
+    def set(self):
+        self.event.set()
+
+    def clear(self):
+        self.event.clear()
+
+    def is_set(self):
+        return self.event.is_set()
+
+    def wait(self, timeout = None):
+        return self.event.wait(timeout)
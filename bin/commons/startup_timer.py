@@ -0,0 +1,56 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class StartupTimer:
+
+    # Startup phases, in the order they happen
+    CONFIG_PHASE = "config"
+    XML_PARSE_PHASE = "xml parse"
+    DRIVER_IMPORT_PHASE = "driver import"
+    PROCESS_SPAWN_PHASE = "process spawn"
+    SESSION_CONNECT_PHASE = "session connect"
+    STATEMENT_PREPARE_PHASE = "statement prepare"
+    PHASES = (CONFIG_PHASE, XML_PARSE_PHASE, DRIVER_IMPORT_PHASE, PROCESS_SPAWN_PHASE, SESSION_CONNECT_PHASE, STATEMENT_PREPARE_PHASE)
+
+    # Wall time spent in every startup phase, and from start to the first row written.
+    # Phases running in other processes are reported back and added by the parent.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.phase_time_map = OrderedDict((phase, 0.0) for phase in StartupTimer.PHASES)
+        self.first_row_time = None
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.phase_time_map[phase] += seconds
+
+    def measure(self, phase, function, *args):
+        # Result of the function; its time is added to the phase
+        start_time = time.time()
+        try:
+            return function(*args)
+        finally:
+            self.add(phase, time.time() - start_time)
+
+    def get_phase_time(self, phase):
+        return self.phase_time_map[phase]
+
+    def mark_first_row_written(self):
+        if self.first_row_time is None:
+            with self.lock:
+                if self.first_row_time is None:
+                    self.first_row_time = time.time() - self.start_time
+
+    def get_first_row_time(self):
+        return self.first_row_time
+
+    def get_report(self):
+        phase_reports = ["%s: [ %.3f ]" % (phase, seconds) for phase, seconds in self.phase_time_map.iteritems()]
+        return "%s, total: [ %.3f ]" % (", ".join(phase_reports), time.time() - self.start_time)
+
+    def get_first_row_report(self):
+        if self.first_row_time is None:
+            return "First row written: [ n/a ]"
+        return "First row written: [ %.3f ] seconds after start" % self.first_row_time
@@ -1,3 +1,5 @@
+import copy
+
 from bin.commons.xml_parser import XMLConstants
 
 class SubscriberDataFactory:    
@@ -10,13 +12,23 @@ class SubscriberDataFactory:
     def get_subscriber_data_for_deletion(subscribers_data_map):
         return SubscriberData(subscribers_data_map, True)
 
+    @staticmethod
+    def get_subscriber_data_for_recomputed_deletion(subscribers_data_map, subscriber_types):
+        # Only the groups of requested types; their customer keys are recomputed instead of read
+        subscribers_data_map_for_type = {}
+        for subscribers_group_index in subscribers_data_map:
+            subscriber_info_map = subscribers_data_map[subscribers_group_index]
+            if subscriber_info_map.__getitem__(XMLConstants.TYPE_TAG) in subscriber_types:
+                subscribers_data_map_for_type[subscribers_group_index] = subscriber_info_map
+        return SubscriberData(subscribers_data_map_for_type, True, True)
+
 class SubscriberData:
-    def __init__(self, subscribers_data_map, for_deletion = False):
+    def __init__(self, subscribers_data_map, for_deletion = False, recompute_keys = False):
         self.subscribers_data_map = subscribers_data_map
         self.subscriber_info_list = []
         
         for subscribers_group_index in self.subscribers_data_map:
-            self.subscriber_info_list.append(SubscriberGroup(subscribers_group_index, self.subscribers_data_map[subscribers_group_index], for_deletion))
+            self.subscriber_info_list.append(SubscriberGroup(subscribers_group_index, self.subscribers_data_map[subscribers_group_index], for_deletion, recompute_keys))
         
     def get_subscriber_group_list(self):
         return self.subscriber_info_list
@@ -25,12 +37,20 @@ class SubscriberData:
         return self.subscribers_data_map.__len__()
 
 class SubscriberGroup:
-    def __init__(self, subscriber_group_index, subscriber_info_map, for_deletion):
+    def __init__(self, subscriber_group_index, subscriber_info_map, for_deletion, recompute_keys = False):
         self.subscriber_group_index = subscriber_group_index
         self.subscriber_info = SubscriberInfo(subscriber_info_map)
         self.for_deletion = for_deletion
+        self.recompute_keys = recompute_keys
         self.subscriber_group_dep_list = self.__create_subscriber_group_dep_list()
 
+        # Whole group, unless split into shards
+        self.shard_index = None
+        self.shard_range = None
+
+        # Ranges acknowledged by an earlier run; None, unless resumed
+        self.acknowledged_ranges = None
+
     def get_subscriber_group_index(self):
         return self.subscriber_group_index
 
@@ -61,6 +81,12 @@ class SubscriberGroup:
     def get_subscriber_group_placeholder_data_list(self):
         return self.subscriber_info.get_placeholder_data_list()
 
+    def get_subscriber_group_number_template(self):
+        return self.subscriber_info.get_number_template()
+
+    def get_subscriber_group_inherit_length(self):
+        return self.subscriber_info.get_inherit_length()
+
     def get_subscriber_group_dep_list(self):
         return self.subscriber_group_dep_list
 
@@ -85,6 +111,44 @@ class SubscriberGroup:
     def is_for_deletion(self):
         return self.for_deletion
 
+    def is_recomputing_keys(self):
+        return self.recompute_keys
+
+    def get_subscriber_group_shard_range(self):
+        # Offsets generated by this group, or this shard of it
+        if self.shard_range is None:
+            return (0, self.get_subscriber_group_limit())
+        return self.shard_range
+
+    def get_subscriber_group_acknowledged_ranges(self):
+        return self.acknowledged_ranges
+
+    def set_subscriber_group_acknowledged_ranges(self, acknowledged_ranges):
+        self.acknowledged_ranges = acknowledged_ranges
+
+    def is_resumed(self):
+        return self.acknowledged_ranges is not None
+
+    def get_subscriber_group_shard_name(self):
+        if self.shard_index is None:
+            return None
+        return "group_%s_shard_%d" % (self.subscriber_group_index, self.shard_index)
+
+    def split(self, shard_size):
+        # Disjoint offset ranges of shard size, in order; shards are numbered the same
+        # on every run with the same data and shard size
+        subscriber_group_limit = self.get_subscriber_group_limit()
+        if shard_size < 1 or subscriber_group_limit is None or subscriber_group_limit <= shard_size:
+            return [self]
+
+        shards = []
+        for shard_index, start_offset in enumerate(xrange(0, subscriber_group_limit, shard_size)):
+            shard = copy.copy(self)
+            shard.shard_index = shard_index
+            shard.shard_range = (start_offset, min(start_offset + shard_size, subscriber_group_limit))
+            shards.append(shard)
+        return shards
+
 
 class SubscriberInfo:
     def __init__(self, subscriber_info_map):
@@ -102,6 +166,8 @@ class SubscriberInfo:
         self.subscriber_format = self.subscriber_info_map.__getitem__(XMLConstants.FORMAT_TAG)
         self.subscriber_placeholder_map = self.subscriber_info_map.__getitem__(XMLConstants.PLACE_HOLDER_TAG)
         self.subscriber_dep_list =  self.subscriber_info_map.__getitem__(XMLConstants.SUBSCRIBER_DEPENDENTS)
+        self.inherit_length = self.subscriber_info_map.get(XMLConstants.INHERIT_LENGTH_TAG, 0)
+        self.number_template = self.subscriber_info_map.get(XMLConstants.NUMBER_TEMPLATE_TAG)
 
         self.placeholder_data_list = self.__create_place_holder_list()
     
@@ -129,6 +195,12 @@ class SubscriberInfo:
     def get_placeholder_data_list(self):
         return self.placeholder_data_list
 
+    def get_number_template(self):
+        return self.number_template
+
+    def get_inherit_length(self):
+        return self.inherit_length
+
     def has_dependents(self):
         if self.subscriber_dep_list.__len__() < 1 :
             return False
@@ -0,0 +1,58 @@
+import datetime
+
+from bin.commons.configuration_reader import ConfigurationReader
+from bin.commons.utils import CommonUtils
+
+
+class TimestampProviderFactory:
+
+    @staticmethod
+    def get_timestamp_provider(configuration):
+        timestamp_mode = configuration.get_generator_timestamp_mode()
+        if timestamp_mode == ConfigurationReader.GENERATOR_TIMESTAMP_ROW_MODE:
+            return PerRowTimestampProvider()
+        elif timestamp_mode == ConfigurationReader.GENERATOR_TIMESTAMP_MONOTONIC_MODE:
+            return MonotonicTimestampProvider()
+        elif timestamp_mode == ConfigurationReader.GENERATOR_TIMESTAMP_FIXED_MODE:
+            return FixedTimestampProvider(configuration.get_generator_run_timestamp())
+        return PerBatchTimestampProvider()
+
+
+def get_current_timestamp():
+    return CommonUtils.unix_time_millis(datetime.datetime.now())
+
+
+class PerRowTimestampProvider:
+
+    # Original behaviour; clock is read for every row
+    def get_timestamps(self, count):
+        return [get_current_timestamp() for _ in xrange(count)]
+
+
+class PerBatchTimestampProvider:
+
+    # Coarse clock; sampled once per batch and shared by all of its rows
+    def get_timestamps(self, count):
+        return [get_current_timestamp()] * count
+
+
+class MonotonicTimestampProvider:
+
+    # Clock is sampled once; every next row is one millisecond after the previous one
+    def __init__(self):
+        self.next_timestamp = get_current_timestamp()
+
+    def get_timestamps(self, count):
+        timestamps = range(self.next_timestamp, self.next_timestamp + count)
+        self.next_timestamp += count
+        return timestamps
+
+
+class FixedTimestampProvider:
+
+    # Same timestamp for every row of the run
+    def __init__(self, run_timestamp):
+        self.run_timestamp = run_timestamp
+
+    def get_timestamps(self, count):
+        return [self.run_timestamp] * count
@@ -1,4 +1,5 @@
 import datetime
+import os
 
 class CommonUtils:
             
@@ -35,6 +36,17 @@ class CommonUtils:
             for item in iterable:
                 return item
         return default
+
+    @staticmethod
+    def open_for_append(filename, record_size):
+        # File of fixed size records, positioned at its end. A record cut short by a
+        # crash is dropped, so that records appended stay aligned
+        if not os.path.isfile(filename):
+            return open(filename, 'wb')
+        write_fd = open(filename, 'r+b')
+        write_fd.truncate(os.path.getsize(filename) - os.path.getsize(filename) % record_size)
+        write_fd.seek(0, os.SEEK_END)
+        return write_fd
     
     
 
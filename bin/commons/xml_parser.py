@@ -2,6 +2,7 @@ from collections import OrderedDict
 import re
 
 from bin.commons.logger import DBLoaderLogger
+from bin.commons.number_template import NumberTemplate
 import xml.etree.ElementTree as ET
 
 
@@ -22,6 +23,8 @@ class XMLConstants:
     PLACE_HOLDER_TAG = "placeholder"
     PLACE_HOLDER_SEARCH_REGEX = "%[^(?!%)]+%"
     INHERIT_TAG = "_INHERIT_"
+    INHERIT_LENGTH_TAG = "inheritLength"
+    NUMBER_TEMPLATE_TAG = "numberTemplate"
     SEMI_COLON_TAG = ";"
     COLON_TAG = ":"
     EQUALS_TAG = "="
@@ -74,7 +77,7 @@ class XMLParser:
     def __generate_subscriber_info_map(self, subscribers):
         return self.__generate_info_map(subscribers)
 
-    def __generate_info_map(self, subscribers, is_recursive = True):
+    def __generate_info_map(self, subscribers, is_recursive = True, parent_place_holder_map = None):
 
         # Get "type" attribute
         subscribers_type = self.__get_attribute_value(subscribers, XMLConstants.TYPE_TAG)
@@ -129,7 +132,7 @@ class XMLParser:
             for subscriber_dep in subscribers.findall(XMLConstants.CALLING_SUBSCRIBER_TAG):
 
                 # Recursive call
-                subscriber_dependent_info_map = self.__generate_info_map(subscriber_dep, False)
+                subscriber_dependent_info_map = self.__generate_info_map(subscriber_dep, False, subscriber_place_holder_map)
                 subscriber_dependent_info_list.append(subscriber_dependent_info_map)
             # ----- End of For-Loop
         else:
@@ -147,6 +150,15 @@ class XMLParser:
             else:
                 if inherit_tag_list.__len__() > 1:
                     raise XMLParserException("Parsing failed... There can be single INHERIT tag allowed for dependent")
+
+        # Inherited value is the padded range value of the parent's first place holder
+        inherit_length, inherit_end_range = self.__get_inherit_length_and_end_range(parent_place_holder_map)
+
+        # Compiling the format once here, so that numbers are produced with integer math
+        number_template = self.__compile_number_template(subscribers_format, subscriber_place_holder_map,
+                                                         inherit_length, inherit_end_range)
+        if number_template is None:
+            self.logger.debug("Format: [ %s ] cannot be expressed numerically, string replacement will be used." % subscribers_format)
                 
         # Creating subscriber info map for corresponding child
         subscriber_info_map = {XMLConstants.XML_NODE_NAME_TAG: subscribers.tag,
@@ -154,10 +166,31 @@ class XMLParser:
                                XMLConstants.FORMAT_TAG: subscribers_format,
                                XMLConstants.PLACE_HOLDER_TAG: subscriber_place_holder_map,
                                XMLConstants.LIMIT_TAG: subscribers_limit,
+                               XMLConstants.INHERIT_LENGTH_TAG: inherit_length,
+                               XMLConstants.NUMBER_TEMPLATE_TAG: number_template,
                                XMLConstants.SUBSCRIBER_DEPENDENTS: subscriber_dependent_info_list}
 
         return subscriber_info_map
 
+    def __get_inherit_length_and_end_range(self, parent_place_holder_map):
+        if not parent_place_holder_map:
+            return 0, 0
+
+        for (_, place_holder_max_length), (_, end_range_int_value) in parent_place_holder_map.iteritems():
+            return place_holder_max_length, end_range_int_value
+
+    def __compile_number_template(self, subscribers_format, place_holder_map, inherit_length, inherit_end_range):
+        if not place_holder_map:
+            return None
+
+        inherit_tag = None
+        if inherit_length > 0:
+            inherit_tag = XMLConstants.INHERIT_TAG
+
+        place_holders = [(place_holder_tag, place_holder_max_length, end_range_int_value)
+                         for (place_holder_tag, place_holder_max_length), (_, end_range_int_value) in place_holder_map.iteritems()]
+        return NumberTemplate.compile(subscribers_format, place_holders, inherit_tag, inherit_length, inherit_end_range)
+
     def __get_place_holder_map(self, subscribers_format, subscribers_value):
 
         msg = ""
@@ -293,17 +326,25 @@ class XMLParser:
 
 
     @staticmethod
-    def get_dummy_subscriber_data_map(subscriber_type = None):
-        info_map = {XMLConstants.XML_NODE_NAME_TAG: XMLConstants.DELETE_NODE_NAME_TAG,
-                               XMLConstants.TYPE_TAG: subscriber_type,
-                               XMLConstants.FORMAT_TAG: None,
-                               XMLConstants.PLACE_HOLDER_TAG: None,
-                               XMLConstants.LIMIT_TAG: None,
-                               XMLConstants.SUBSCRIBER_DEPENDENTS: None}
+    def get_dummy_subscriber_data_map(subscriber_types):
+        # One deletion group per subscriber type
         subscriber_data_map = {}
-        subscriber_data_map[0] =  info_map
+        for subscriber_type in subscriber_types:
+            info_map = {XMLConstants.XML_NODE_NAME_TAG: XMLConstants.DELETE_NODE_NAME_TAG,
+                                   XMLConstants.TYPE_TAG: subscriber_type,
+                                   XMLConstants.FORMAT_TAG: None,
+                                   XMLConstants.PLACE_HOLDER_TAG: None,
+                                   XMLConstants.LIMIT_TAG: None,
+                                   XMLConstants.INHERIT_LENGTH_TAG: 0,
+                                   XMLConstants.NUMBER_TEMPLATE_TAG: None,
+                                   XMLConstants.SUBSCRIBER_DEPENDENTS: None}
+            subscriber_data_map[XMLParser.get_delete_node_group_index(subscriber_type)] =  info_map
         return subscriber_data_map
 
+    @staticmethod
+    def get_delete_node_group_index(subscriber_type):
+        return "%s_%s" % (XMLConstants.DELETE_NODE_NAME_TAG, subscriber_type)
+
 # ---------------------> XML Parser Exceptions
 
 class XMLParserException(Exception):
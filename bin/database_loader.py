@@ -1,6 +1,10 @@
 import time
 
+from bin import global_settings
+from bin.commons.checkpoint_journal import RangeCheckpointJournal
+from bin.commons.configuration_reader import ConfigurationReader
 from bin.commons.logger import DBLoaderLogger
+from bin.commons.startup_timer import StartupTimer
 from bin.commons.subscriber_data_mapper import SubscriberDataFactory
 from bin.commons.xml_parser import XMLParser, XMLParserException
 from bin.dbclient.db_client import DbClientException
@@ -13,30 +17,34 @@ class DatabaseLoader:
         self.logger = DBLoaderLogger.get_instance(DatabaseLoader.__name__)
         self.client_execution_manager = ClientExecutionManager()
           
-    def start_population(self, subscriber_data_path, db_client):
+    def start_population(self, subscriber_data_path, db_client, resume = False):
 
         self.logger.info("##---------------------- Database Loader Started ----------------------##")
         start_time_stamp = time.time()
          
-        status = self.__start_population(subscriber_data_path, db_client)
+        checkpoint_journal = self.__open_checkpoint_journal(RangeCheckpointJournal.POPULATION_SCENARIO)
+        status = self.__start_population(subscriber_data_path, db_client, checkpoint_journal, resume)
+        self.__close_checkpoint_journal(checkpoint_journal)
             
+        self.logger.info(global_settings.startup_timer.get_first_row_report())
         self.logger.info("Total time taken: [ %d ] seconds." % (time.time() - start_time_stamp))
         self.logger.info("##---------------------- Database Loader Finished ----------------------##\n")
         return status
         
-    def __start_population(self, subscriber_data_path, db_client):            
+    def __start_population(self, subscriber_data_path, db_client, checkpoint_journal, resume):            
         status = False
         try:
             # Reading raw subscriber data
             xmlParser = XMLParser()
-            xmlParser.parse(subscriber_data_path)
+            global_settings.startup_timer.measure(StartupTimer.XML_PARSE_PHASE, xmlParser.parse, subscriber_data_path)
             
             # Connecting to client processor; Shared by all the processes
             query_manager = CassandraQueryManager(xmlParser.get_subscribers_data_map())
             if db_client.connect(query_manager):
+                self.__report_startup()
                 # Finally executing our scenarios
                 subscriber_data = SubscriberDataFactory.get_subscriber_data(xmlParser.get_subscribers_data_map())
-                self.client_execution_manager.execute(subscriber_data, db_client.get_client_handle())
+                self.client_execution_manager.execute(subscriber_data, db_client.get_client_handle(), checkpoint_journal, resume)
                 status = True
             
         except (XMLParserException, DbClientException, Exception) as err:
@@ -47,27 +55,35 @@ class DatabaseLoader:
                 
         return status
 
-    def start_deletion(self, db_client, subscriber_type):
+    def start_deletion(self, db_client, subscriber_types, subscriber_data_path = None, resume = False):
 
         self.logger.info("##---------------------- Database Loader Started ----------------------##")
         start_time_stamp = time.time()
-         
-        status = self.__start_deletion(db_client, subscriber_type)
+        
+        # With subscriber data, customer keys are recomputed instead of read from the key files
+        checkpoint_journal = self.__open_checkpoint_journal(RangeCheckpointJournal.DELETION_SCENARIO)
+        if subscriber_data_path:
+            status = self.__start_recomputed_deletion(subscriber_data_path, db_client, subscriber_types, checkpoint_journal, resume)
+        else:
+            status = self.__start_deletion(db_client, subscriber_types, checkpoint_journal, resume)
+        self.__close_checkpoint_journal(checkpoint_journal)
             
+        self.logger.info(global_settings.startup_timer.get_first_row_report())
         self.logger.info("Total time taken: [ %d ] seconds." % (time.time() - start_time_stamp))
         self.logger.info("##---------------------- Database Loader Finished ----------------------##\n")
         return status
 
-    def __start_deletion(self, db_client, subscriber_type):
+    def __start_deletion(self, db_client, subscriber_types, checkpoint_journal, resume):
         status = False
         try:                
             # Connecting to client processor; Shared by all the processes
-            subscriber_map_for_deletion = XMLParser.get_dummy_subscriber_data_map(subscriber_type)
+            subscriber_map_for_deletion = XMLParser.get_dummy_subscriber_data_map(subscriber_types)
             query_manager = CassandraQueryManager(subscriber_map_for_deletion)
             if db_client.connect(query_manager):
+                self.__report_startup()
                 # Finally executing our scenarios
                 subscriber_data = SubscriberDataFactory.get_subscriber_data_for_deletion(subscriber_map_for_deletion)
-                self.client_execution_manager.execute(subscriber_data, db_client.get_client_handle())
+                self.client_execution_manager.execute(subscriber_data, db_client.get_client_handle(), checkpoint_journal, resume)
                 status = True
             
         except (XMLParserException, DbClientException, Exception) as err:
@@ -76,6 +92,49 @@ class DatabaseLoader:
             db_client.close()                
         return status
 
+    def __start_recomputed_deletion(self, subscriber_data_path, db_client, subscriber_types, checkpoint_journal, resume):
+        status = False
+        try:
+            if global_settings.configuration_reader.get_generator_customer_key_mode() != ConfigurationReader.GENERATOR_CUSTOMER_KEY_SEEDED_MODE:
+                self.logger.error("Customer keys can be recomputed only in [ %s ] customer key mode." % ConfigurationReader.GENERATOR_CUSTOMER_KEY_SEEDED_MODE)
+                return status
+
+            # Reading raw subscriber data; groups are regenerated to recompute the keys
+            xmlParser = XMLParser()
+            global_settings.startup_timer.measure(StartupTimer.XML_PARSE_PHASE, xmlParser.parse, subscriber_data_path)
+            subscriber_data = SubscriberDataFactory.get_subscriber_data_for_recomputed_deletion(xmlParser.get_subscribers_data_map(), subscriber_types)
+            if subscriber_data.get_count() < 1:
+                self.logger.error("No subscriber groups found for subscriber types: [ %s ]." % ",".join(subscriber_types))
+                return status
+
+            # Connecting to client processor; Shared by all the processes
+            query_manager = CassandraQueryManager(XMLParser.get_dummy_subscriber_data_map(subscriber_types))
+            if db_client.connect(query_manager):
+                self.__report_startup()
+                self.client_execution_manager.execute(subscriber_data, db_client.get_client_handle(), checkpoint_journal, resume)
+                status = True
+
+        except (XMLParserException, DbClientException, Exception) as err:
+            self.logger.error(err)
+        finally:
+            db_client.close()
+        return status
+
+    def __open_checkpoint_journal(self, scenario):
+        checkpoint_journal = RangeCheckpointJournal(scenario, global_settings.configuration_reader.get_pipeline_checkpoint_interval())
+        checkpoint_journal.open()
+        return checkpoint_journal
+
+    def __close_checkpoint_journal(self, checkpoint_journal):
+        # Only once the client is closed, i.e. every chunk is completed
+        checkpoint_journal.close()
+        self.logger.info("Checkpoint journal - %s" % checkpoint_journal.get_report())
+
+    def __report_startup(self):
+        startup_report = "Startup time (seconds) - %s" % global_settings.startup_timer.get_report()
+        print startup_report
+        self.logger.info(startup_report)
+
     def stop(self):
         if self.client_execution_manager:
             self.client_execution_manager.shutdown()
\ No newline at end of file
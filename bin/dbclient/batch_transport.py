@@ -0,0 +1,165 @@
+from array import array
+import cPickle
+import multiprocessing
+import os
+import struct
+
+from bin.commons.columnar_batch import ColumnarBatch, INT64_ARRAY_TYPECODE
+
+# Transports created by this process; forked group processes inherit them
+_transport_registry = {}
+
+
+class ChunkCodec:
+
+    # A chunk is shipped as the raw buffers of its columns. Rows are packed once in
+    # the group process and unpacked, still column wise, in the session worker; in
+    # between only a handful of strings is moved around.
+    @staticmethod
+    def pack(params):
+        if not isinstance(params, ColumnarBatch):
+            params = ColumnarBatch.from_rows(params)
+        return (params.get_row_count(), tuple(ChunkCodec.__pack_column(column_type, data) for column_type, data in params.get_columns()))
+
+    @staticmethod
+    def unpack(packed_chunk):
+        row_count, packed_columns = packed_chunk
+        return ColumnarBatch(row_count, [ChunkCodec.__unpack_column(column_type, buffer, row_count) for column_type, buffer in packed_columns])
+
+    @staticmethod
+    def get_row_count(packed_chunk):
+        return packed_chunk.__getitem__(0)
+
+    @staticmethod
+    def __pack_column(column_type, data):
+        if column_type == ColumnarBatch.NULL_COLUMN:
+            return (column_type, '')
+        elif column_type == ColumnarBatch.UUID_COLUMN:
+            return (column_type, data)
+        elif column_type == ColumnarBatch.INT64_COLUMN:
+            return (column_type, data.tostring())
+        return (column_type, cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def __unpack_column(column_type, buffer, row_count):
+        if column_type == ColumnarBatch.NULL_COLUMN:
+            return ColumnarBatch.null_column()
+        elif column_type == ColumnarBatch.UUID_COLUMN:
+            return ColumnarBatch.uuid_column(buffer)
+        elif column_type == ColumnarBatch.INT64_COLUMN:
+            if INT64_ARRAY_TYPECODE is None:
+                return ColumnarBatch.int64_column(struct.unpack('=%dq' % row_count, buffer))
+            column = array(INT64_ARRAY_TYPECODE)
+            column.fromstring(buffer)
+            return ColumnarBatch.int64_column(column)
+        return (column_type, cPickle.loads(buffer))
+
+
+class PackedBatch:
+
+    # Consumer side view of a chunk; params stay packed until a session worker needs them
+    def __init__(self, params):
+        self.subscriber_group_index = params.__getitem__(0)
+        self.subscriber_group_name = params.__getitem__(1)
+        self.subscriber_group_type = params.__getitem__(2)
+        self.packed_chunk = params.__getitem__(3)
+        self.checkpoint_tag = params.__getitem__(4)
+
+    def get_subscriber_group_index(self):
+        return self.subscriber_group_index
+
+    def get_subscriber_group_type(self):
+        return self.subscriber_group_type
+
+    def get_subscriber_group_name(self):
+        return self.subscriber_group_name
+
+    def get_packed_chunk(self):
+        return self.packed_chunk
+
+    def get_row_count(self):
+        return ChunkCodec.get_row_count(self.packed_chunk)
+
+    def get_params(self):
+        return ChunkCodec.unpack(self.packed_chunk)
+
+    def get_checkpoint_tag(self):
+        return self.checkpoint_tag
+
+
+class BatchTransport:
+
+    # Pipe backed queue between group processes and session pools. It replaces the
+    # manager proxied queue, which pickled every row into the manager process and out
+    # of it again. Pipes cannot be pickled, so the transport must be created before
+    # the group processes are forked; pickling it carries only its registry id.
+    def __init__(self, capacity = 0):
+        self.transport_id = "%d-%d" % (os.getpid(), _transport_registry.__len__())
+        self.queue = multiprocessing.JoinableQueue(capacity)
+        self.peak_depth = 0
+        self.checkpoint_journal = None
+        _transport_registry[self.transport_id] = self
+
+    def __getstate__(self):
+        return {'transport_id': self.transport_id}
+
+    def __setstate__(self, state):
+        self.__dict__.update(_transport_registry[state['transport_id']].__dict__)
+
+    @staticmethod
+    def pack(batch):
+        return (batch.get_subscriber_group_index(),
+                batch.get_subscriber_group_name(),
+                batch.get_subscriber_group_type(),
+                ChunkCodec.pack(batch.get_params()),
+                batch.get_checkpoint_tag())
+
+    def put(self, batch, block = True, timeout = None):
+        self.put_packed(BatchTransport.pack(batch), block, timeout)
+
+    # Producers retrying on a full transport pack the batch only once
+    def put_packed(self, packed_batch, block = True, timeout = None):
+        self.queue.put(packed_batch, block, timeout)
+
+    def get(self, block = True, timeout = None):
+        packed_batch = PackedBatch(self.queue.get(block, timeout))
+        self.__update_peak_depth()
+        return packed_batch
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def task_done(self):
+        self.queue.task_done()
+
+    def set_checkpoint_journal(self, checkpoint_journal):
+        # Set by the process consuming the transport, before the group processes are forked
+        self.checkpoint_journal = checkpoint_journal
+
+    def complete(self, packed_batch, is_acknowledged):
+        # Chunk is done; its range is checkpointed when every row was acknowledged by the driver
+        if self.checkpoint_journal:
+            self.checkpoint_journal.acknowledge(packed_batch.get_checkpoint_tag(), is_acknowledged)
+        self.queue.task_done()
+
+    def join(self):
+        self.queue.join()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def get_depth(self):
+        # Chunks waiting in the transport; -1 where the platform cannot tell
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:
+            return -1
+
+    def get_peak_depth(self):
+        return self.peak_depth
+
+    def __update_peak_depth(self):
+        # Sampled by the consumer; the chunk just taken is counted as well
+        depth = self.get_depth() + 1
+        if depth > self.peak_depth:
+            self.peak_depth = depth
@@ -0,0 +1,142 @@
+import threading
+import time
+
+from cassandra.cluster import Cluster
+
+from bin import global_settings
+from bin.commons.logger import DBLoaderLogger
+from bin.commons.startup_timer import StartupTimer
+from bin.commons.xml_parser import XMLConstants
+from bin.dbclient.batch_transport import BatchTransport
+from bin.dbclient.cassandradb.cassandra_async_engine import CassandraAsyncEngine
+from bin.dbclient.cassandradb.cassandra_debug_statistics import CassandraDebugStatistics
+from bin.dbclient.cassandradb.cassandra_query_manager import CassandraQueries
+from bin.dbclient.cassandradb.cassandra_session_manager import get_load_balancing_policy, get_partition_batch_statements
+from bin.dbclient.cassandradb.partition_batch import PartitionBatchPlanner
+from bin.dbclient.db_client import DbClient, DbClientException
+
+
+class CassandraAsyncClient(DbClient):
+
+    # Alternative to the session pools: a few sessions in this process, driven by
+    # the async engine. Sessions count is the number of connection pools.
+    def __init__(self):
+        self.logger = DBLoaderLogger.get_instance(CassandraAsyncClient.__name__)
+        self.configuration = global_settings.configuration_reader
+        self.batch_queue = None
+        self.sessions = []
+        self.async_engine = None
+        self.cassandra_client_debug_statistics = None
+
+    def connect(self, query_manager):
+        status = False
+        try:
+            # Created before the group processes are forked
+            self.batch_queue = BatchTransport(self.configuration.get_pipeline_transport_capacity())
+
+            # Sessions connect and prepare side by side; bring up takes as long as the slowest session
+            session_count = self.configuration.get_db_no_of_connection_pools()
+            connected_sessions = [None] * session_count
+            connecting_threads = [threading.Thread(target=self.__connect_and_prepare, args=(query_manager, connected_sessions, session_index))
+                                  for session_index in range(session_count)]
+            for connecting_thread in connecting_threads:
+                connecting_thread.start()
+            for connecting_thread in connecting_threads:
+                connecting_thread.join()
+
+            connected_sessions = [connected_session for connected_session in connected_sessions if connected_session is not None]
+            self.sessions = [session for session, _, _, _ in connected_sessions]
+            if self.sessions.__len__() < session_count:
+                raise DbClientException("Only [ %d ] sessions were connected out of [ %d ] requested." % (self.sessions.__len__(), session_count))
+            prepared_query_stores = [prepared_query_store for _, prepared_query_store, _, _ in connected_sessions]
+            global_settings.startup_timer.add(StartupTimer.SESSION_CONNECT_PHASE, max(connect_time for _, _, connect_time, _ in connected_sessions))
+            global_settings.startup_timer.add(StartupTimer.STATEMENT_PREPARE_PHASE, max(prepare_time for _, _, _, prepare_time in connected_sessions))
+
+            if self.configuration.is_debug_stats_enabled():
+                self.cassandra_client_debug_statistics = CassandraDebugStatistics()
+                if not self.cassandra_client_debug_statistics.start_capture():
+                    raise DbClientException("Failed to start debug statistics.")
+
+            partition_batch_planner = None
+            if self.configuration.is_partition_batch_enabled():
+                partition_batch_planner = PartitionBatchPlanner(self.configuration.get_db_partition_batch_max_statements(),
+                                                                self.configuration.get_db_partition_batch_max_bytes())
+            request_builder = CassandraRequestBuilder(prepared_query_stores, partition_batch_planner)
+            self.async_engine = CassandraAsyncEngine(self.sessions, request_builder.build,
+                                                     self.configuration.get_db_async_max_in_flight(),
+                                                     self.cassandra_client_debug_statistics)
+            self.async_engine.start(self.batch_queue)
+            self.logger.info("Started async engine with [ %d ] sessions and up to [ %d ] requests in flight." % (self.sessions.__len__(),
+                                                                                                                 self.configuration.get_db_async_max_in_flight()))
+            status = True
+        except Exception as err:
+            self.logger.error(err)
+        return status
+
+    def __connect_and_prepare(self, query_manager, connected_sessions, session_index):
+        session = None
+        try:
+            start_time = time.time()
+            session = self.__connect_session()
+            connect_time = time.time() - start_time
+
+            start_time = time.time()
+            prepared_query_store = query_manager.get_instance(session)
+            connected_sessions[session_index] = (session, prepared_query_store, connect_time, time.time() - start_time)
+        except Exception as err:
+            self.logger.error(err)
+            if session:
+                session.cluster.shutdown()
+
+    def __connect_session(self):
+        nodes = [self.configuration.get_db_cluster_connection_point()]
+        cluster = Cluster(nodes, load_balancing_policy=get_load_balancing_policy(self.configuration))
+        cluster.protocol_version = int(self.configuration.get_db_cluster_protocol_version())
+        cluster.port = 9042
+
+        session = cluster.connect(keyspace=CassandraQueries.PSUSER_DATA_SCHEMA)
+        if session is None:
+            raise DbClientException("Failed to establish connection with cluster connection nodes: [ %s ]." % nodes)
+        self.logger.info("Connection established successfully with cluster connection nodes [ %s ]." % nodes)
+        return session
+
+    def close(self):
+        if self.batch_queue:
+            self.logger.info("Waiting for batches to be loaded...")
+            self.batch_queue.join()
+            self.logger.info("Batch transport peak depth: [ %d ] chunks." % self.batch_queue.get_peak_depth())
+
+        if self.async_engine:
+            self.async_engine.stop()
+            self.logger.info("Async engine %s" % self.async_engine.get_report())
+
+        for session in self.sessions:
+            session.cluster.shutdown()
+
+        if self.cassandra_client_debug_statistics:
+            self.cassandra_client_debug_statistics.stop_capture()
+
+    def get_client_handle(self):
+        return self.batch_queue
+
+
+class CassandraRequestBuilder:
+
+    # Requests of a chunk for one session; prepared statements belong to their session
+    def __init__(self, prepared_query_stores, partition_batch_planner = None):
+        self.prepared_query_stores = prepared_query_stores
+        self.partition_batch_planner = partition_batch_planner
+
+    def build(self, session_index, batch):
+        prepared_statement = self.prepared_query_stores[session_index].get_prepared_statement(batch.get_subscriber_group_index(),
+                                                                                             batch.get_subscriber_group_type(),
+                                                                                             batch.get_subscriber_group_name())
+        if not prepared_statement:
+            return []
+
+        params = batch.get_params()
+        if self.partition_batch_planner and batch.get_subscriber_group_name() == XMLConstants.CALLING_SUBSCRIBER_TAG:
+            return [(batch_statement, None, row_count) for batch_statement, row_count in get_partition_batch_statements(self.partition_batch_planner,
+                                                                                                                       prepared_statement,
+                                                                                                                       params)]
+        return [(prepared_statement, row, 1) for row in params.to_rows()]
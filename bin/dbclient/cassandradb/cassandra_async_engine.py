@@ -0,0 +1,147 @@
+import threading
+
+from bin import global_settings
+from bin.commons.logger import DBLoaderLogger
+
+
+class CassandraAsyncEngine:
+
+    # Executes chunks from the batch transport on a few sessions with execute_async.
+    # Requests of consecutive chunks share one budget of requests in flight, and
+    # completions are handled by the driver's event loop thread, so one process keeps
+    # thousands of requests in flight without any session process. The request
+    # builder turns a chunk into (statement, params, row count) requests for a session.
+    def __init__(self, sessions, request_builder, max_in_flight, cassandra_debug_statistics = None):
+        self.logger = DBLoaderLogger.get_instance(CassandraAsyncEngine.__name__)
+        self.sessions = sessions
+        self.request_builder = request_builder
+        self.max_in_flight = max_in_flight
+        self.cassandra_debug_statistics = cassandra_debug_statistics
+
+        self.in_flight_semaphore = threading.BoundedSemaphore(max_in_flight)
+        self.stop_event = threading.Event()
+        self.dispatching_thread = None
+        self.next_session_index = 0
+
+        self.statistics_lock = threading.Lock()
+        self.requests_in_flight = 0
+        self.peak_requests_in_flight = 0
+        self.requests_completed = 0
+        self.requests_failed = 0
+        self.rows_completed = 0
+
+    def start(self, batch_queue):
+        self.dispatching_thread = self.DispatchingThread(self, batch_queue, self.stop_event)
+        self.dispatching_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.dispatching_thread:
+            self.dispatching_thread.join()
+
+    def dispatch(self, batch, on_completion):
+        # Chunks are spread over the sessions round robin
+        session_index = self.next_session_index
+        self.next_session_index = (session_index + 1) % self.sessions.__len__()
+        session = self.sessions[session_index]
+
+        requests = self.request_builder(session_index, batch)
+        if not requests:
+            on_completion(False)
+            return
+
+        chunk_completion = ChunkCompletion(requests.__len__(), on_completion)
+        for statement, params, row_count in requests:
+            self.in_flight_semaphore.acquire()
+            with self.statistics_lock:
+                self.requests_in_flight += 1
+                if self.requests_in_flight > self.peak_requests_in_flight:
+                    self.peak_requests_in_flight = self.requests_in_flight
+            try:
+                future = session.execute_async(statement, params)
+                future.add_callbacks(self.__on_success, self.__on_error,
+                                     callback_args=(chunk_completion, row_count), errback_args=(chunk_completion, row_count))
+            except Exception as err:
+                self.__on_error(err, chunk_completion, row_count)
+
+    def __on_success(self, _, chunk_completion, row_count):
+        global_settings.startup_timer.mark_first_row_written()
+        self.__on_request_completion(chunk_completion, row_count, True)
+
+    def __on_error(self, err, chunk_completion, row_count):
+        if self.requests_failed == 0:
+            self.logger.error("Request failed... Error: [ %s ]" % str(err))
+        self.__on_request_completion(chunk_completion, row_count, False)
+
+    def __on_request_completion(self, chunk_completion, row_count, is_success):
+        # Runs on the event loop thread of the driver
+        with self.statistics_lock:
+            self.requests_in_flight -= 1
+            self.requests_completed += 1
+            if is_success:
+                self.rows_completed += row_count
+            else:
+                self.requests_failed += 1
+        self.in_flight_semaphore.release()
+
+        success_count = chunk_completion.complete(row_count, is_success)
+        if success_count is not None and self.cassandra_debug_statistics:
+            self.cassandra_debug_statistics.udpate(success_count)
+
+    def get_requests_in_flight(self):
+        return self.requests_in_flight
+
+    def get_report(self):
+        return "Requests: [ %d ], Failed: [ %d ], Rows written: [ %d ], Peak in flight: [ %d ] of [ %d ]" % (self.requests_completed,
+                                                                                                            self.requests_failed,
+                                                                                                            self.rows_completed,
+                                                                                                            self.peak_requests_in_flight,
+                                                                                                            self.max_in_flight)
+
+    class DispatchingThread(threading.Thread):
+        def __init__(self, async_engine, batch_queue, stop_event):
+            self.logger = DBLoaderLogger.get_instance(CassandraAsyncEngine.DispatchingThread.__name__)
+            threading.Thread.__init__(self)
+            self.setDaemon(True)
+            self.async_engine = async_engine
+            self.batch_queue = batch_queue
+            self.stop_event = stop_event
+
+        def run(self):
+            self.logger.debug("Async dispatching thread started...")
+            while not self.stop_event.is_set():
+                try:
+                    batch = self.batch_queue.get(True, 1)
+                except:
+                    continue # Timeout; Will try again
+
+                try:
+                    self.async_engine.dispatch(batch, lambda is_acknowledged, batch=batch: self.batch_queue.complete(batch, is_acknowledged))
+                except Exception as err:
+                    self.logger.error("Exception while dispatching chunk... Error: [ %s ]" % str(err))
+                    self.batch_queue.task_done()
+
+
+class ChunkCompletion:
+
+    # Chunk is done with its last request; only then it is marked done on the transport,
+    # as acknowledged when none of its requests failed
+    def __init__(self, request_count, on_completion):
+        self.remaining_requests = request_count
+        self.success_count = 0
+        self.is_acknowledged = True
+        self.on_completion = on_completion
+        self.lock = threading.Lock()
+
+    def complete(self, row_count, is_success):
+        # Rows written by the chunk once its last request completes, None before that
+        with self.lock:
+            self.remaining_requests -= 1
+            if is_success:
+                self.success_count += row_count
+            else:
+                self.is_acknowledged = False
+            if self.remaining_requests > 0:
+                return None
+        self.on_completion(self.is_acknowledged)
+        return self.success_count
@@ -1,11 +1,13 @@
 from bin import global_settings
+from bin.commons.configuration_reader import ConfigurationReader
 from bin.commons.logger import DBLoaderLogger
-from bin.dbclient.cassandradb.cassandra_session_manager import CassandraSessionPoolManager
+from bin.commons.startup_timer import StartupTimer
 from bin.dbclient.db_client import DbClient
 
 class CassandraClient(DbClient):
     
     def __init__(self):
+        from bin.dbclient.cassandradb.cassandra_session_manager import CassandraSessionPoolManager
         self.logger = DBLoaderLogger.get_instance(CassandraClient.__name__)
         self.configuration = global_settings.configuration_reader
         self.cassandra_session_pool_manager = CassandraSessionPoolManager(self.configuration)
@@ -18,4 +20,16 @@ class CassandraClient(DbClient):
         self.cassandra_session_pool_manager.stop()
     
     def get_client_handle(self):
-        return self.cassandra_session_pool_manager.get_pool_processing_handle()
\ No newline at end of file
+        return self.cassandra_session_pool_manager.get_pool_processing_handle()
+
+
+class CassandraClientFactory:
+
+    @staticmethod
+    def get_cassandra_client(configuration):
+        # The driver takes a while to import; it is imported only once a client is needed
+        global_settings.startup_timer.measure(StartupTimer.DRIVER_IMPORT_PHASE, __import__, "cassandra.cluster")
+        if configuration.get_db_engine() == ConfigurationReader.DB_ASYNC_ENGINE:
+            from bin.dbclient.cassandradb.cassandra_async_client import CassandraAsyncClient
+            return CassandraAsyncClient()
+        return CassandraClient()
\ No newline at end of file
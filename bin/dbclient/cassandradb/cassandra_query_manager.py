@@ -17,6 +17,7 @@ class CassandraPreparedQueryStore:
         self.session = session
         self.subscribers_data_map = subscribers_data_map 
         self.prepare_stmt_map = {}
+        self.prepared_statement_by_query = {} # Statements with the same query are prepared once
         
     def prepare(self):
         # Preparing query map; for easy retrieval at the time of tuple preparation.
@@ -34,7 +35,7 @@ class CassandraPreparedQueryStore:
         # Recursively, populate the query map according to subscriber type.
         node_name = subscribers_info_map.__getitem__(XMLConstants.XML_NODE_NAME_TAG)
         subscribers_type = subscribers_info_map.__getitem__(XMLConstants.TYPE_TAG)
-        query_map[(subscribers_type, node_name)] = self.__get_query(subscribers_type, node_name)
+        query_map[(subscribers_type, node_name)] = self.__get_prepared_statement(self.__get_query(subscribers_type, node_name))
 
 
         subscriber_dependent_list = subscribers_info_map.__getitem__(XMLConstants.SUBSCRIBER_DEPENDENTS)
@@ -52,36 +53,43 @@ class CassandraPreparedQueryStore:
         
         return statement
 
+    def __get_prepared_statement(self, query):
+        prepared_statement = self.prepared_statement_by_query.get(query)
+        if prepared_statement is None:
+            prepared_statement = self.session.prepare(query)
+            self.prepared_statement_by_query[query] = prepared_statement
+        return prepared_statement
+
     def __get_query(self, subscribers_type, node_name):
-        # This function, returns prepared query, as per the subscriber type
+        # This function, returns query to be prepared, as per the subscriber type
         if node_name == XMLConstants.SUBSCRIBERS_TAG:
             
             if subscribers_type == XMLConstants.SCENARIO_TYPE_ALLOWED:
-                return self.session.prepare(CassandraQueries.INSERT_UPS_ALLOWED_SCENARIO_STMT)
+                return CassandraQueries.INSERT_UPS_ALLOWED_SCENARIO_STMT
 
             elif subscribers_type == XMLConstants.SCENARIO_TYPE_BLOCKED:
-                return self.session.prepare(CassandraQueries.INSERT_UPS_BLOCKED_SCENARIO_STMT)
+                return CassandraQueries.INSERT_UPS_BLOCKED_SCENARIO_STMT
 
             elif subscribers_type == XMLConstants.SCENARIO_TYPE_SCREENING_ALLOWED:
-                return self.session.prepare(CassandraQueries.INSERT_UPS_SCREENING_ALLOWED_SCENARIO_STMT)
+                return CassandraQueries.INSERT_UPS_SCREENING_ALLOWED_SCENARIO_STMT
 
             elif subscribers_type == XMLConstants.SCENARIO_TYPE_SCREENING_BLOCKED:
-                return self.session.prepare(CassandraQueries.INSERT_UPS_SCREENING_BLOCKED_SCENARIO_STMT)
+                return CassandraQueries.INSERT_UPS_SCREENING_BLOCKED_SCENARIO_STMT
             else:
                 raise CassandraQueryManagerException("Failed to prepare cassandra query statements... Invalid subscriber type: [ %s ] for node_name: [ %s ]" % (subscribers_type,
                                                                                                                                                                 XMLConstants.SUBSCRIBERS_TAG))             
         elif node_name == XMLConstants.CALLING_SUBSCRIBER_TAG:
  
             if subscribers_type == XMLConstants.SCENARIO_TYPE_ALLOWED:
-                return self.session.prepare(CassandraQueries.INSERT_UICBT_ALLOWED_SCENARIO_STMT)
+                return CassandraQueries.INSERT_UICBT_ALLOWED_SCENARIO_STMT
 
             elif subscribers_type == XMLConstants.SCENARIO_TYPE_BLOCKED:
-                return self.session.prepare(CassandraQueries.INSERT_UICBT_BLOCKED_SCENARIO_STMT)
+                return CassandraQueries.INSERT_UICBT_BLOCKED_SCENARIO_STMT
             else:
                 raise CassandraQueryManagerException("Failed to prepare cassandra query statements... Invalid subscriber type: [ %s ] for node_name: [ %s ]" % (subscribers_type,
                                                                                                                                                                 XMLConstants.CALLING_SUBSCRIBER_TAG))
         elif node_name == XMLConstants.DELETE_NODE_NAME_TAG:
-            return self.session.prepare(CassandraQueries.DELETE_UICBT_STMT)
+            return CassandraQueries.DELETE_UICBT_STMT
     
         else:
             raise CassandraQueryManagerException("Failed to prepare cassandra query statements... Invalid node name: [ %s ]" % node_name)
@@ -4,12 +4,25 @@ import os
 import threading
 import time
 
+from itertools import izip, repeat
+from Queue import Empty
+
+from cassandra import OperationTimedOut, WriteTimeout
 from cassandra.cluster import Cluster
-from cassandra.concurrent import execute_concurrent_with_args
+from cassandra.concurrent import execute_concurrent
+from cassandra.policies import DCAwareRoundRobinPolicy, TokenAwarePolicy
+from cassandra.protocol import OverloadedErrorMessage
+from cassandra.query import BatchStatement, BatchType
 
+from bin import global_settings
 from bin.commons.logger import DBLoaderLogger
+from bin.commons.startup_timer import StartupTimer
+from bin.commons.xml_parser import XMLConstants
+from bin.dbclient.batch_transport import BatchTransport, ChunkCodec
 from bin.dbclient.cassandradb.cassandra_debug_statistics import CassandraDebugStatistics
 from bin.dbclient.cassandradb.cassandra_query_manager import CassandraQueries
+from bin.dbclient.cassandradb.concurrency_controller import AdaptiveConcurrencyController
+from bin.dbclient.cassandradb.partition_batch import PartitionBatchPlanner
 from bin.dbclient.db_client import DbClientException
 from cassandra.connection import ConnectionException
 
@@ -22,10 +35,8 @@ class CassandraSessionPoolManager:
         
     def initialize(self, query_manager):
         self.logger.debug("Initializing Cassandra Session Pool Manager with [ %d ] session pools instances..." % self.no_of_connection_pool)
-        manager = multiprocessing.Manager()
-        
-        self.close_event = manager.Event() # For closing all the sessions
-        self.batch_queue = manager.Queue() # Single queues from which batches will be processed from
+        self.close_event = multiprocessing.Event() # For closing all the sessions; inherited by the session processes
+        self.batch_queue = BatchTransport(self.configuration.get_pipeline_transport_capacity()) # Single transport from which batches will be processed from
 
         self.cassandra_client_debug_statistics = None
         if self.debug_stats_enabled:
@@ -42,15 +53,24 @@ class CassandraSessionPoolManager:
         self.logger.debug("Starting Cassandra Session Pool Manager...")
         status = False
         
+        # Sessions of all the pools connect and prepare side by side; bring up takes as
+        # long as the slowest session
         for connection_pool_index in range(self.no_of_connection_pool):    
             self.logger.debug("Starting Session Pool - [ %d ]..." % connection_pool_index)
+            self.session_pool_map[connection_pool_index].start()
+
+        ready_deadline = time.time() + CassandraSessionPool.SESSIONS_READY_TIMEOUT
+        session_startup_times = [(0.0, 0.0)]
+        for connection_pool_index in range(self.no_of_connection_pool):
             cassandra_session_pool = self.session_pool_map[connection_pool_index]
-            status = cassandra_session_pool.start()
-            if not status:
+            if not cassandra_session_pool.wait_until_ready(ready_deadline):
                 self.logger.warn("Failed to start Session Pool - [ %d ]..." % connection_pool_index)
                 continue
-            else:
-                self.logger.info("Started Session Pool - [ %d ]" % connection_pool_index)
+            self.logger.info("Started Session Pool - [ %d ]" % connection_pool_index)
+            session_startup_times.extend(cassandra_session_pool.get_session_startup_times())
+            status = True
+        global_settings.startup_timer.add(StartupTimer.SESSION_CONNECT_PHASE, max(connect_time for connect_time, _ in session_startup_times))
+        global_settings.startup_timer.add(StartupTimer.STATEMENT_PREPARE_PHASE, max(prepare_time for _, prepare_time in session_startup_times))
             
         if status:
             self.logger.info("Successfully started Cassandra Session Pool Manager.")
@@ -66,6 +86,7 @@ class CassandraSessionPoolManager:
     def stop(self):
         self.logger.info("Waiting for batches to be loaded...")
         self.batch_queue.join() # Wait for all batches to arrive
+        self.logger.info("Batch transport peak depth: [ %d ] chunks." % self.batch_queue.get_peak_depth())
         
         self.logger.debug("All batches processed successfully. Now stopping Cassandra Session Pool Manager...")
         self.close_event.set()
@@ -75,6 +96,7 @@ class CassandraSessionPoolManager:
             cassandra_session_pool = self.session_pool_map[connection_pool_index]
             cassandra_session_pool.stop()
             self.logger.info("Successfully stopped Session Pool - [ %d ]" % connection_pool_index)
+            self.logger.info("Session Pool - [ %d ] %s" % (connection_pool_index, cassandra_session_pool.get_utilization_report()))
 
         if self.cassandra_client_debug_statistics:
             self.cassandra_client_debug_statistics.stop_capture()      
@@ -85,6 +107,9 @@ class CassandraSessionPoolManager:
         return self.batch_queue
 
 class CassandraSessionPool:
+
+    # Seconds given to the sessions of all the pools to connect and prepare
+    SESSIONS_READY_TIMEOUT = 15
     
     def __init__(self, batch_queue, configuration, query_manager, close_event, cassandra_client_debug_statistics):
         self.logger = DBLoaderLogger.get_instance(CassandraSessionPool.__name__)
@@ -96,18 +121,37 @@ class CassandraSessionPool:
         self.cassandra_client_debug_statistics = cassandra_client_debug_statistics
         
         self.number_of_sessions = configuration.get_db_no_of_sessions()
+        self.dispatch_window = configuration.get_pipeline_dispatch_window()
         self.connection_guard_semaphore = multiprocessing.BoundedSemaphore(self.number_of_sessions)
+        self.readiness_queue = multiprocessing.Queue() # Every session reports once it is connected, or has given up
+        self.session_startup_times = []
         self.session_pool = None
+        self.internal_batch_loader = None
 
     def start(self):
+        # Returns right away; sessions connect in the background until waited for
+        status = False
+        try:
+            self.session_pool = global_settings.startup_timer.measure(StartupTimer.PROCESS_SPAWN_PHASE, Pool,
+                                                                      self.number_of_sessions, self._setup,
+                                                                      (self.query_manager, self.connection_guard_semaphore,
+                                                                       self.close_event, self.configuration, self.readiness_queue, ))
+            status = True
+        except Exception as err:
+            self.logger.error(err)
+        return status
+
+    def wait_until_ready(self, ready_deadline):
         status = False
+        if self.session_pool is None:
+            return status
         try:
-            self.session_pool = Pool(processes=self.number_of_sessions, initializer=self._setup, initargs=(self.query_manager, self.connection_guard_semaphore,
-                                                                                                           self.close_event, self.configuration, ))
-            self.__wait_for_sessions_to_be_active()
-            internal_batch_loading_thread = self.InternalBatchLoadingThread(self.batch_queue, 
-                                                                            self.InternalBatchLoader(self.session_pool,
-                                                                                                     self.cassandra_client_debug_statistics))        
+            self.__wait_for_sessions_to_be_active(ready_deadline)
+            self.internal_batch_loader = self.InternalBatchLoader(self.session_pool,
+                                                                  self.cassandra_client_debug_statistics,
+                                                                  self.number_of_sessions,
+                                                                  self.dispatch_window)
+            internal_batch_loading_thread = self.InternalBatchLoadingThread(self.batch_queue, self.internal_batch_loader)
             internal_batch_loading_thread.start()
             status = True
         except Exception as err:
@@ -115,37 +159,51 @@ class CassandraSessionPool:
         return status
 
     @classmethod
-    def _setup(cls, query_manager, connection_guard_semaphore, close_event, configuration):
+    def _setup(cls, query_manager, connection_guard_semaphore, close_event, configuration, readiness_queue):
         # FIXME: Add a way to kill the process, when we fail to establish connection        
         cls.casssandra_session = CassandraSession( query_manager, connection_guard_semaphore, close_event, configuration)
-        cls.casssandra_session.connect()
+        status = cls.casssandra_session.connect()
+        readiness_queue.put((status, ) + cls.casssandra_session.get_startup_times())
 
     @classmethod
     def execute(cls, subscriber_group_index, subscriber_group_type, subscriber_group_name, params):
         return cls.casssandra_session.execute(subscriber_group_index, subscriber_group_type, subscriber_group_name, params)
+
+    @classmethod
+    def get_concurrency_window(cls):
+        return cls.casssandra_session.get_concurrency_window()
     
+    def get_utilization_report(self):
+        if self.internal_batch_loader:
+            return self.internal_batch_loader.get_utilization_report()
+        return "Utilization: [ n/a ]"
+
     def stop(self):
         self.__wait_for_sessions_to_be_closed()
         if self.session_pool:        
             self.session_pool.close()
             self.session_pool.join()
             
-    def __wait_for_sessions_to_be_active(self):
-        # Waiting for connections to come up
-        retry_count = 1
-        are_all_sessions_up = False
-        while retry_count <= 5:
-            if self.connection_guard_semaphore.get_value() == 0:
-                self.logger.info("Connections established successfully having [ %d ] active sessions." % self.number_of_sessions)
-                are_all_sessions_up = True
+    def get_session_startup_times(self):
+        # Connect and prepare time of every session which is up
+        return self.session_startup_times
+
+    def __wait_for_sessions_to_be_active(self, ready_deadline):
+        # Every session reports exactly once; waiting ends as soon as the last one did
+        active_sessions = 0
+        for reported_sessions in range(self.number_of_sessions):
+            try:
+                status, connect_time, prepare_time = self.readiness_queue.get(True, max(0, ready_deadline - time.time()))
+            except Empty:
                 break
-            else :
-                self.logger.debug("Waiting for all the sessions to come up. Current active sessions: [ %d ]" % (self.number_of_sessions - self.connection_guard_semaphore.get_value()))
-                time.sleep(1 * retry_count)
-                retry_count = retry_count + 1
+            if status:
+                active_sessions += 1
+                self.session_startup_times.append((connect_time, prepare_time))
+            self.logger.debug("Sessions reported: [ %d ] of [ %d ], active sessions: [ %d ]" % (reported_sessions + 1, self.number_of_sessions, active_sessions))
          
-        if not are_all_sessions_up:
-            raise DbClientException("Only [ %d ] active connections were established out of [ %d ] requested." % ((self.number_of_sessions - self.connection_guard_semaphore.get_value()), self.number_of_sessions))
+        if active_sessions < self.number_of_sessions:
+            raise DbClientException("Only [ %d ] active connections were established out of [ %d ] requested." % (active_sessions, self.number_of_sessions))
+        self.logger.info("Connections established successfully having [ %d ] active sessions." % self.number_of_sessions)
         
     def __wait_for_sessions_to_be_closed(self):
         retry_count = 1
@@ -165,32 +223,94 @@ class CassandraSessionPool:
     
     
     class InternalBatchLoader:
-        def __init__(self, session_pool, cassandra_debug_statistics):
+        # Keeps up to dispatch window chunks in flight on the session pool. Every
+        # completion frees a slot and the next chunk is dispatched right away, so that
+        # sessions are not left idle at the tail of a dispatch round.
+        def __init__(self, session_pool, cassandra_debug_statistics, number_of_sessions, dispatch_window):
             self.logger = DBLoaderLogger.get_instance(CassandraSessionPool.InternalBatchLoader.__name__)
             self.session_pool = session_pool
             self.cassandra_debug_statistics = cassandra_debug_statistics
+            self.number_of_sessions = number_of_sessions
+            self.window_semaphore = threading.BoundedSemaphore(dispatch_window)
+            
+            self.utilization_lock = threading.Lock()
+            self.chunks_in_flight = 0
+            self.chunks_completed = 0
+            self.busy_time = 0.0
+            self.first_dispatch_time = None
+            self.last_completion_time = None
+            self.concurrency_windows = {} # Last in flight window reported by every session
+            
+        def acquire_slot(self):
+            self.window_semaphore.acquire()
+            
+        def release_slot(self):
+            self.window_semaphore.release()
             
-        def load(self, batch):
+        # A slot must be held; it is released on completion
+        def load(self, batch, on_completion):
             try:
-                params = batch.get_params() 
-                self.logger.debug("Loading batch of size: [ %d ] ..." % params .__len__())
-                start_time = time.time()
-                
-                # Parse the batch
-                job_args = [(batch.get_subscriber_group_index(), 
-                             batch.get_subscriber_group_type(),
-                             batch.get_subscriber_group_name(),
-                             params[n:n+100]) for n in range(0, len(params), 100)]
-                
-                results = self.session_pool.map(cassandra_session_pool_worker, job_args)
-                if self.cassandra_debug_statistics and results:
-                    self.cassandra_debug_statistics.udpate(sum(results))
-                    
-                end_time = time.time()
-                self.logger.debug("Time taken to load batch is [ %d ] seconds." % (end_time - start_time))
+                job_args = (batch.get_subscriber_group_index(), 
+                            batch.get_subscriber_group_type(),
+                            batch.get_subscriber_group_name(),
+                            batch.get_packed_chunk())
                 
+                with self.utilization_lock:
+                    self.chunks_in_flight += 1
+                    if self.first_dispatch_time is None:
+                        self.first_dispatch_time = time.time()
+                        
+                self.session_pool.apply_async(cassandra_session_pool_worker, (job_args, ),
+                                              callback=lambda result: self.__on_completion(result, on_completion))
             except Exception as err:
                 self.logger.error("Exception while loading batch... Error: [ %s ]" % str(err))
+                self.__on_completion((0, False, 0.0, None, None), on_completion)
+                
+        def __on_completion(self, result, on_completion):
+            # Runs on the result handler thread of the session pool
+            success_count, is_acknowledged, execution_time, session_id, concurrency_window = result
+            if session_id is not None:
+                global_settings.startup_timer.mark_first_row_written()
+            with self.utilization_lock:
+                self.chunks_in_flight -= 1
+                self.chunks_completed += 1
+                self.busy_time += execution_time
+                self.last_completion_time = time.time()
+                if session_id is not None:
+                    self.concurrency_windows[session_id] = concurrency_window
+                
+            if self.cassandra_debug_statistics:
+                self.cassandra_debug_statistics.udpate(success_count)
+            self.release_slot()
+            on_completion(is_acknowledged)
+            
+        def get_chunks_in_flight(self):
+            return self.chunks_in_flight
+            
+        def get_utilization(self):
+            # Share of the session time spent executing, between the first dispatch and the last completion
+            if self.first_dispatch_time is None or self.last_completion_time is None:
+                return 0.0
+            elapsed_time = self.last_completion_time - self.first_dispatch_time
+            if elapsed_time <= 0:
+                return 0.0
+            return min(1.0, self.busy_time / (elapsed_time * self.number_of_sessions))
+            
+        def get_concurrency_windows(self):
+            with self.utilization_lock:
+                return self.concurrency_windows.values()
+
+        def get_utilization_report(self):
+            concurrency_windows = self.get_concurrency_windows()
+            concurrency_window_report = "n/a"
+            if concurrency_windows:
+                concurrency_window_report = "%d / %.1f / %d" % (min(concurrency_windows),
+                                                                float(sum(concurrency_windows)) / concurrency_windows.__len__(),
+                                                                max(concurrency_windows))
+            return "Utilization: [ %.1f ] %%, Chunks executed: [ %d ], Busy time: [ %.1f ] session seconds, Session windows (min / avg / max): [ %s ]" % (self.get_utilization() * 100,
+                                                                                                                                                         self.chunks_completed,
+                                                                                                                                                         self.busy_time,
+                                                                                                                                                         concurrency_window_report)
     
     class InternalBatchLoadingThread(threading.Thread):
         def __init__(self, batch_queue, batch_loader):
@@ -204,12 +324,19 @@ class CassandraSessionPool:
             self.logger.debug("Internal batch loader thread started...")
             try:
                 while True:
+                    # Wait for a free slot in the window before taking the next chunk
+                    self.batch_loader.acquire_slot()
                     try:
                         batch = self.batch_queue.get(True, 3)
-                        self.batch_loader.load(batch)
-                        self.batch_queue.task_done()
                     except:
-                        pass # Timeout; Will try again
+                        self.batch_loader.release_slot()
+                        continue # Timeout; Will try again
+                    
+                    self.logger.debug("Dispatching chunk of [ %d ] rows; Chunks in flight: [ %d ], Batch transport depth: [ %d ] chunks, Session windows: %s." % (batch.get_row_count(),
+                                                                                                                                                                 self.batch_loader.get_chunks_in_flight(),
+                                                                                                                                                                 self.batch_queue.get_depth(),
+                                                                                                                                                                 self.batch_loader.get_concurrency_windows()))
+                    self.batch_loader.load(batch, lambda is_acknowledged, batch=batch: self.batch_queue.complete(batch, is_acknowledged))
             except Exception as err:
                 self.logger.error(err)
                 self.__flush() 
@@ -219,11 +346,40 @@ class CassandraSessionPool:
                 self.batch_queue.get(True, 1)
                 self.batch_queue.task_done()
 
+def get_partition_batch_statements(partition_batch_planner, prepared_statement, params):
+    # One unlogged batch per partition range, with its row count; a batch is routed by the key of its first statement
+    rows = params.to_rows()
+    batch_statements = []
+    for start_offset, end_offset in partition_batch_planner.get_batch_ranges(params):
+        batch_statement = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for row in rows[start_offset:end_offset]:
+            batch_statement.add(prepared_statement, row)
+        batch_statements.append((batch_statement, end_offset - start_offset))
+    return batch_statements
+
+def get_load_balancing_policy(configuration):
+    # Given explicitly either way; the driver picks the token aware one by itself otherwise
+    if configuration.is_token_aware_routing_enabled():
+        return TokenAwarePolicy(DCAwareRoundRobinPolicy())
+    return DCAwareRoundRobinPolicy()
+
 def cassandra_session_pool_worker(arguments):
-    s_g_i, s_g_t, s_g_n, params= arguments
-    return CassandraSessionPool.execute(s_g_i, s_g_t, s_g_n, params)
+    # Never raises; a chunk which is not completed would hold its window slot forever
+    s_g_i, s_g_t, s_g_n, packed_chunk = arguments
+    start_time = time.time()
+    success_count = 0
+    is_acknowledged = False
+    try:
+        success_count, is_acknowledged = CassandraSessionPool.execute(s_g_i, s_g_t, s_g_n, ChunkCodec.unpack(packed_chunk))
+    except Exception as err:
+        print err
+    return (success_count, is_acknowledged, time.time() - start_time, os.getpid(), CassandraSessionPool.get_concurrency_window())
 
 class CassandraSession:
+
+    # Failures telling that the cluster takes more than it can handle
+    OVERLOAD_ERRORS = (WriteTimeout, OperationTimedOut, OverloadedErrorMessage)
+
     def __init__(self, query_manager, connection_guard_semaphore, close_event, configuration):
         self.query_manager = query_manager
         self.connection_guard_semaphore = connection_guard_semaphore
@@ -234,6 +390,11 @@ class CassandraSession:
     
     def __initialize_configuration(self):    
         self.debug_stats_enabled = self.configuration.is_debug_stats_enabled()        
+        self.concurrency_controller = AdaptiveConcurrencyController(int(self.configuration.get_db_session_concurrency()))
+        self.partition_batch_planner = None
+        if self.configuration.is_partition_batch_enabled():
+            self.partition_batch_planner = PartitionBatchPlanner(self.configuration.get_db_partition_batch_max_statements(),
+                                                                 self.configuration.get_db_partition_batch_max_bytes())
         self.nodes = [self.configuration.get_db_cluster_connection_point()]
         
         self.prepared_query_store = None
@@ -241,6 +402,8 @@ class CassandraSession:
         self.session = None
         self.session_using_lock = threading.RLock() # To ensure safe disconnection of sessions
         self.session_clean_up_thread = self.SessionCleanUpThread(self, self.close_event)
+        self.connect_time = 0.0
+        self.prepare_time = 0.0
         
     def connect(self):
         status = False
@@ -251,16 +414,20 @@ class CassandraSession:
         
             try:
                 # Setting up database connection
-                self.cluster = Cluster(self.nodes)
+                self.cluster = Cluster(self.nodes, load_balancing_policy=get_load_balancing_policy(self.configuration))
                 self.cluster.protocol_version = int(self.configuration.get_db_cluster_protocol_version())
                 self.cluster.port = 9042
                 
                 # A session manages connection pool for us
+                start_time = time.time()
                 self.session = self.cluster.connect(keyspace=CassandraQueries.PSUSER_DATA_SCHEMA)
                 if self.session is None:
                     raise DbClientException("For process with id: [ %s ], Failed to establish connection with cluster connection nodes: [ %s ]." % (os.getpid(), self.nodes))
+                self.connect_time = time.time() - start_time
 
+                start_time = time.time()
                 self.prepared_query_store = self.query_manager.get_instance(self.session)
+                self.prepare_time = time.time() - start_time
 
                 # Only start clean up thread, when we have valid session...
                 self.session_clean_up_thread.start()                        
@@ -278,10 +445,14 @@ class CassandraSession:
                 
         return status    
                     
+    def get_startup_times(self):
+        return (self.connect_time, self.prepare_time)
+
     def close(self):
         self.session_using_lock.acquire()
         try:
             if self.session:
+                print("Concurrency for process id: [ %s ], %s" % (os.getpid(), self.concurrency_controller.get_report()))
                 self.session.cluster.shutdown()
                 self.session.shutdown()
 #                 print "session closed for process id %s" % os.getpid()
@@ -290,13 +461,20 @@ class CassandraSession:
             self.session_using_lock.release()
         
     def execute(self, subscriber_group_index, subscriber_group_type, subscriber_group_name, params):
+        # Rows written, counted only with debug statistics, and whether the driver acknowledged all of them
         success_count = 0
+        is_acknowledged = False
         try:
             self.session_using_lock.acquire()
                
             prepared_statement = self.prepared_query_store.get_prepared_statement( subscriber_group_index, subscriber_group_type, subscriber_group_name)
-            if prepared_statement:
-                results = execute_concurrent_with_args(self.session, prepared_statement, params)
+            if prepared_statement and self.partition_batch_planner and subscriber_group_name == XMLConstants.CALLING_SUBSCRIBER_TAG:
+                # Calling subscribers share the customer key of their parent i.e. one partition
+                success_count, is_acknowledged = self.__execute_partition_batches(prepared_statement, params)
+
+            elif prepared_statement:
+                # Columns are turned into bind tuples only here, right before the driver
+                results, is_acknowledged = self.__execute_concurrent(izip(repeat(prepared_statement), params.to_rows()))
                 if self.debug_stats_enabled:
                     success_count = self.__get_execution_success_count(results)
                        
@@ -305,8 +483,38 @@ class CassandraSession:
         finally:
             self.session_using_lock.release() 
             
-        return success_count   
+        return (success_count, is_acknowledged)
         
+    def __execute_partition_batches(self, prepared_statement, params):
+        batch_statements = get_partition_batch_statements(self.partition_batch_planner, prepared_statement, params)
+        results, is_acknowledged = self.__execute_concurrent([(batch_statement, None) for batch_statement, _ in batch_statements])
+        success_count = 0
+        if self.debug_stats_enabled:
+            for (_, row_count), result in zip(batch_statements, results):
+                if result.__getitem__(0):
+                    success_count += row_count
+        return (success_count, is_acknowledged)
+
+    def __execute_concurrent(self, statements_and_params):
+        # Requests in flight are bounded by the window of the controller, which is tuned after every chunk
+        start_time = time.time()
+        results = execute_concurrent(self.session, statements_and_params, concurrency=self.concurrency_controller.get_window(), raise_on_first_error=False)
+        elapsed_time = time.time() - start_time
+
+        failures = [result for is_success, result in results if not is_success]
+        overload_count = 0
+        for failure in failures:
+            if isinstance(failure, CassandraSession.OVERLOAD_ERRORS):
+                overload_count += 1
+        if failures:
+            print("For process id: [ %s ], [ %d ] of [ %d ] requests failed. First error: [ %s ]" % (os.getpid(), failures.__len__(), results.__len__(), failures.__getitem__(0)))
+
+        self.concurrency_controller.update(results.__len__(), elapsed_time, overload_count)
+        return (results, not failures)
+
+    def get_concurrency_window(self):
+        return self.concurrency_controller.get_window()
+
     def __get_execution_success_count(self, results):
         successful_executions = 0
         if results :
@@ -0,0 +1,64 @@
+class AdaptiveConcurrencyController:
+
+    # AIMD window of requests in flight for one session. Every clean chunk adds a
+    # step; overload errors (write timeouts, overloaded coordinators) halve the
+    # window and a latency well above the best one seen trims it. The configured
+    # session concurrency is the ceiling.
+    ADDITIVE_STEP = 2
+    OVERLOAD_DECREASE_FACTOR = 0.5
+    LATENCY_DECREASE_FACTOR = 0.9
+    LATENCY_TOLERANCE = 2.0
+
+    # Best latency is forgotten slowly, so that a one off fast chunk does not pin it
+    BASELINE_DRIFT = 1.01
+
+    def __init__(self, ceiling, floor = 1):
+        self.ceiling = max(floor, ceiling)
+        self.floor = floor
+        self.window = max(floor, self.ceiling // 4)
+        self.baseline_latency = None
+        self.last_latency = None
+        self.increases = 0
+        self.decreases = 0
+
+    def get_window(self):
+        return self.window
+
+    def get_ceiling(self):
+        return self.ceiling
+
+    def get_last_latency(self):
+        return self.last_latency
+
+    def get_report(self):
+        return "Window: [ %d ] of [ %d ], Increases: [ %d ], Decreases: [ %d ]" % (self.window, self.ceiling, self.increases, self.decreases)
+
+    def update(self, request_count, elapsed_time, overload_count):
+        if request_count <= 0:
+            return self.window
+
+        if overload_count > 0:
+            self.__decrease(AdaptiveConcurrencyController.OVERLOAD_DECREASE_FACTOR)
+            return self.window
+
+        # Little's law; requests were kept window deep in flight for the whole chunk
+        latency = elapsed_time * min(self.window, request_count) / request_count
+        self.last_latency = latency
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency *= AdaptiveConcurrencyController.BASELINE_DRIFT
+
+        if latency > self.baseline_latency * AdaptiveConcurrencyController.LATENCY_TOLERANCE:
+            self.__decrease(AdaptiveConcurrencyController.LATENCY_DECREASE_FACTOR)
+        elif request_count >= self.window and self.window < self.ceiling:
+            # Only a chunk which filled the window tells that more would fit
+            self.window = min(self.ceiling, self.window + AdaptiveConcurrencyController.ADDITIVE_STEP)
+            self.increases += 1
+        return self.window
+
+    def __decrease(self, factor):
+        window = max(self.floor, int(self.window * factor))
+        if window < self.window:
+            self.decreases += 1
+        self.window = window
@@ -0,0 +1,51 @@
+from bin.commons.columnar_batch import ColumnarBatch
+
+
+class PartitionBatchPlanner:
+
+    # Splits a chunk into row ranges which can go as one unlogged batch each: rows of
+    # one partition key (first bind column), within the statement and byte limits.
+    # Rows are fixed size, so the byte limit is turned into a statement limit.
+    def __init__(self, max_statements, max_bytes):
+        self.max_statements = max_statements
+        self.max_bytes = max_bytes
+
+    def get_statements_per_batch(self, columnar_batch):
+        return self.get_statements_per_batch_for_row_size(columnar_batch.get_size_in_bytes() // max(1, columnar_batch.get_row_count()))
+
+    def get_statements_per_batch_for_row_size(self, row_size):
+        return max(1, min(self.max_statements, self.max_bytes // max(1, row_size)))
+
+    def get_batch_ranges(self, columnar_batch):
+        statements_per_batch = self.get_statements_per_batch(columnar_batch)
+        batch_ranges = []
+        for start_offset, end_offset in self.get_partition_ranges(columnar_batch):
+            for batch_start_offset in xrange(start_offset, end_offset, statements_per_batch):
+                batch_ranges.append((batch_start_offset, min(batch_start_offset + statements_per_batch, end_offset)))
+        return batch_ranges
+
+    def get_partition_ranges(self, columnar_batch):
+        # Consecutive rows with the same partition key; dependents of one parent are
+        # generated together, so a dependent chunk is a single range
+        row_count = columnar_batch.get_row_count()
+        if row_count == 0:
+            return []
+        column_type, data = columnar_batch.get_columns().__getitem__(0)
+        if column_type == ColumnarBatch.UUID_COLUMN:
+            uuid_size = ColumnarBatch.UUID_SIZE
+            if data == data[:uuid_size] * row_count:
+                return [(0, row_count)]
+            keys = [data[index * uuid_size:(index + 1) * uuid_size] for index in xrange(row_count)]
+        elif column_type == ColumnarBatch.INT64_COLUMN or column_type == ColumnarBatch.OBJECT_COLUMN:
+            keys = data
+        else:
+            return [(0, row_count)]
+
+        partition_ranges = []
+        start_offset = 0
+        for index in xrange(1, row_count):
+            if keys[index] != keys[index - 1]:
+                partition_ranges.append((start_offset, index))
+                start_offset = index
+        partition_ranges.append((start_offset, row_count))
+        return partition_ranges
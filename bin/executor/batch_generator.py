@@ -1,16 +1,22 @@
 from abc import abstractmethod
 import abc
-import datetime
-import uuid
 
+from bin.commons.columnar_batch import ColumnarBatch
+from bin.commons.customer_key_generator import CustomerKeyGeneratorFactory
+from bin.commons.place_holder_space import PlaceHolderSpace
+from bin.commons.timestamp_provider import TimestampProviderFactory
 from bin.commons.utils import CommonUtils
-from bin.commons.xml_parser import XMLConstants
+from bin.commons.xml_parser import XMLConstants, XMLParser
+from bin.dbclient.batch_transport import ChunkCodec
+from bin.dbclient.cassandradb.partition_batch import PartitionBatchPlanner
+from bin.executor.chunk_planner import ChunkPlanner
+from bin.executor.column_generator import UserNumberColumnGenerator, DependentUserNumberTable
 
 class BatchGenerator:
     __metaclass__ = abc.ABCMeta
     
     def __init__(self, subscriber_group, configuration):
-        self.db_batch_size = int(configuration.get_db_batch_size())
+        self.chunk_size = int(configuration.get_pipeline_chunk_size())
         self.subscriber_group = subscriber_group
         self.__initialize()
         
@@ -21,52 +27,71 @@ class BatchGenerator:
         self.subscriber_group_type = self.subscriber_group.get_subscriber_group_type()
         self.subscriber_group_name = self.subscriber_group.get_subscriber_group_name()
         
+        # Ranges are linear offsets in the mixed radix space of all place holders
         place_holder_list = self.subscriber_group.get_subscriber_group_placeholder_data_list()
         self.place_holder_data = CommonUtils.get_first_from_iterable(place_holder_list)
-        self.max_range_value = self.subscriber_limit + self.place_holder_data.get_start_range()
-        self.place_holder_range_save_map = {}
-        self.remaining_records_to_prepare = self.subscriber_limit
+        self.place_holder_space = PlaceHolderSpace(place_holder_list)
+        shard_start_offset, shard_end_offset = self.subscriber_group.get_subscriber_group_shard_range()
+        self.chunk_planner = ChunkPlanner(shard_end_offset - shard_start_offset, self.chunk_size, shard_start_offset,
+                                          self.subscriber_group.get_subscriber_group_acknowledged_ranges())
+        
+        # Formats which cannot be expressed numerically use the string replacement path
+        self.inherit_length = self.subscriber_group.get_subscriber_group_inherit_length()
+        self.number_template = self.subscriber_group.get_subscriber_group_number_template()
+        self.user_number_column_generator = None
+        if self.number_template:
+            self.user_number_column_generator = UserNumberColumnGenerator(self.number_template, self.place_holder_space)
  
     def is_finished(self):
         
-        # Error
-        if self.remaining_records_to_prepare > 0:
+        if self.chunk_planner.has_next():
             return False
         else:
-            # When finished, reset it to original limit for processing next request
-            self.remaining_records_to_prepare = self.subscriber_limit
+            # When finished, reset it to the first chunk for processing next request
+            self.chunk_planner.reset()
             return True
-            
-
-    def get_start_range(self):
-        # Check whether there is a range value we want to continue from ... 
-        start_range = self.place_holder_data.get_start_range()
-        place_holder_tag = self.place_holder_data.get_place_holer_tag()
-        if self.place_holder_range_save_map.__contains__(place_holder_tag):
-            start_range = self.place_holder_range_save_map.__getitem__(place_holder_tag)
-            self.place_holder_range_save_map.__delitem__(place_holder_tag)
-                    
-        return start_range
     
-    def get_end_range(self, current_range):
-        diff = self.max_range_value - current_range
-        if diff > self.db_batch_size:
-            end_range = current_range + self.db_batch_size
-            self.place_holder_range_save_map[self.place_holder_data.get_place_holer_tag()] = end_range
-        else:
-            end_range = current_range + diff    
-        return end_range
-    
-    def get_number_for_replacing(self, range_value):
-        return CommonUtils.get_padded_number(range_value, self.place_holder_data.get_place_holder_tag_length())
+    def get_number_for_replacing(self, range_value, place_holder_data):
+        return CommonUtils.get_padded_number(range_value, place_holder_data.get_place_holder_tag_length())
     
-    def get_tuple_to_be_inserted(self, user_number_range_value, customer_key):
-        updated_subscribers_format = self.subscriber_format.replace(self.place_holder_data.get_place_holer_tag(),user_number_range_value)
-        return (long(updated_subscribers_format), customer_key, None)
+    def get_user_number(self, range_values, inherited_range_value = None):
+        if self.number_template:
+            if inherited_range_value is None:
+                return self.number_template.get_value(range_values)
+            return self.number_template.get_value(range_values, inherited_range_value)
+
+        # Fall back on string replacement
+        updated_subscribers_format = self.subscriber_format
+        if inherited_range_value is not None:
+            updated_subscribers_format = updated_subscribers_format.replace(XMLConstants.INHERIT_TAG,
+                                                                            CommonUtils.get_padded_number(inherited_range_value, self.inherit_length))
+        for range_value, place_holder_data in zip(range_values, self.place_holder_space.get_place_holder_data_list()):
+            updated_subscribers_format = updated_subscribers_format.replace(place_holder_data.get_place_holer_tag(),
+                                                                            self.get_number_for_replacing(range_value, place_holder_data))
+        return long(updated_subscribers_format)
+
+    def get_tuple_to_be_inserted(self, range_values, customer_key):
+        return (self.get_user_number(range_values), customer_key, None)
+
+    def get_user_numbers(self, start_offset, end_offset):
+        if self.user_number_column_generator:
+            return self.user_number_column_generator.generate(start_offset, end_offset)
+
+        return [self.get_user_number(range_values) for range_values in self.place_holder_space.iterate(start_offset, end_offset)]
+
+    def get_columnar_batch(self, user_number_column, customer_key_buffer):
+        # Bind order of subscriber insertion; tuples are built only at the driver boundary
+        return ColumnarBatch(user_number_column.__len__(), [ColumnarBatch.int64_column(user_number_column),
+                                                            ColumnarBatch.uuid_column(customer_key_buffer),
+                                                            ColumnarBatch.null_column()])
+
+    def get_checkpoint_tag(self, start_range_value, end_range_value, chunk_count = 1):
+        # Range of the group is acknowledged once all the chunks tagged with it are; their count is in the tag
+        return (self.subscriber_group_index, start_range_value, end_range_value, chunk_count)
 
-    def add_info_to_batch(self, prepared_batch):
+    def add_info_to_batch(self, prepared_batch, checkpoint_tag = None):
         if prepared_batch.__len__() > 0:
-            return (self.subscriber_group_index, self.subscriber_group_name, self.subscriber_group_type, prepared_batch)
+            return (self.subscriber_group_index, self.subscriber_group_name, self.subscriber_group_type, prepared_batch, checkpoint_tag)
         else:
             return None
         
@@ -77,77 +102,127 @@ class BatchGenerator:
     
 class BatchGeneratorForSubscriberWithoutDependents(BatchGenerator):
 
-    def __init__(self, subscriber_group, configuration, customer_key_saver):
+    def __init__(self, subscriber_group, configuration, customer_key_journal):
         BatchGenerator.__init__(self, subscriber_group, configuration)
-        self.customer_key_saver = customer_key_saver
+        self.customer_key_journal = customer_key_journal
+        self.customer_key_generator = CustomerKeyGeneratorFactory.get_customer_key_generator(configuration)
         
     def prepare(self):
-        value_list = []
-        start_range_value = self.get_start_range()
-        end_range_value = self.get_end_range(start_range_value)
-        while start_range_value < end_range_value:
-            customer_key = uuid.uuid4()
-            self.customer_key_saver.store(customer_key)
-            user_number_range_value = self.get_number_for_replacing(start_range_value)
-            prepared_tuple = self.get_tuple_to_be_inserted(user_number_range_value, customer_key)
-            value_list.append(prepared_tuple)
-            start_range_value +=1
-            
-        self.remaining_records_to_prepare -= value_list.__len__()
-        return self.add_info_to_batch(value_list)
+        start_range_value, end_range_value = self.chunk_planner.next_chunk()
+        
+        user_number_column = self.get_user_numbers(start_range_value, end_range_value)
+        customer_key_buffer = self.customer_key_generator.get_customer_key_buffer(user_number_column)
+        self.customer_key_journal.append(customer_key_buffer)
+        value_list = self.get_columnar_batch(user_number_column, customer_key_buffer)
+        return self.add_info_to_batch(value_list, self.get_checkpoint_tag(start_range_value, end_range_value))
     
     
 class BatchGeneratorForSubscriberWithDependents(BatchGenerator):
     
-    def __init__(self, subscriber_group, queue, configuration, customer_key_saver):
+    def __init__(self, subscriber_group, queue, configuration, customer_key_journal):
         BatchGenerator.__init__(self, subscriber_group, configuration)
         self.queue = queue
-        self.customer_key_saver = customer_key_saver
+        self.customer_key_journal = customer_key_journal
+        self.customer_key_generator = CustomerKeyGeneratorFactory.get_customer_key_generator(configuration)
+
+        # Chunks of dependents generated for every parent
+        self.dependent_chunk_count = sum(BatchGeneratorForDependents.get_chunk_count(subscriber_dep_group_info, configuration)
+                                         for subscriber_dep_group_info in subscriber_group.get_subscriber_group_dep_list())
         
     def prepare(self):
-        value_list = []
-        start_range_value = self.get_start_range()
-        end_range_value = self.get_end_range(start_range_value)
-        while start_range_value < end_range_value:
-            customer_key = uuid.uuid4()
-            self.customer_key_saver.store(customer_key)
-            user_number_range_value = self.get_number_for_replacing(start_range_value)
-            prepared_tuple = self.get_tuple_to_be_inserted(user_number_range_value, customer_key)
-    
-            # Post the tuple on the queue
-            self.queue.put((customer_key, user_number_range_value))
-            
-            value_list.append(prepared_tuple)
-            start_range_value +=1
-            
-        self.remaining_records_to_prepare -= value_list.__len__()
-        return self.add_info_to_batch(value_list)
+        start_range_value, end_range_value = self.chunk_planner.next_chunk()
+        
+        user_number_column = self.get_user_numbers(start_range_value, end_range_value)
+        customer_key_buffer = self.customer_key_generator.get_customer_key_buffer(user_number_column)
+        self.customer_key_journal.append(customer_key_buffer)
+        value_list = self.get_columnar_batch(user_number_column, customer_key_buffer)
+
+        # Range is acknowledged with the dependents of all its parents
+        checkpoint_tag = self.get_checkpoint_tag(start_range_value, end_range_value, 1 + user_number_column.__len__() * self.dependent_chunk_count)
+        
+        # Post the customer keys of the chunk on the queue as one packed block, for
+        # preparing dependents. Dependents inherit the value of the first place holder.
+        inherited_range_value_list = self.place_holder_space.get_leading_range_values(start_range_value, end_range_value)
+        self.queue.put((checkpoint_tag, ChunkCodec.pack(ColumnarBatch(inherited_range_value_list.__len__(), [ColumnarBatch.uuid_column(customer_key_buffer),
+                                                                                                             ColumnarBatch.int64_column(inherited_range_value_list)]))))
+        return self.add_info_to_batch(value_list, checkpoint_tag)
     
         
 class BatchGeneratorForDependents(BatchGenerator):
     
+    # Beyond this, dependent numbers are not precomputed, to keep the memory in check
+    DEPENDENT_USER_NUMBER_TABLE_MAX_SIZE = 1000000
+
+    # Payload of a dependent row i.e. c, f and t
+    DEPENDENT_ROW_SIZE = ColumnarBatch.UUID_SIZE + 8 + 8
+    
     def __init__(self, subscriber_group, configuration):
         BatchGenerator.__init__(self, subscriber_group, configuration)
+        self.timestamp_provider = TimestampProviderFactory.get_timestamp_provider(configuration)
+
+        dependent_chunk_size = BatchGeneratorForDependents.get_chunk_size(configuration)
+        if self.chunk_size != dependent_chunk_size:
+            self.chunk_size = dependent_chunk_size
+            self.chunk_planner = ChunkPlanner(self.subscriber_limit, self.chunk_size)
+        
+        self.dependent_user_number_table = None
+        if self.user_number_column_generator and self.subscriber_limit <= BatchGeneratorForDependents.DEPENDENT_USER_NUMBER_TABLE_MAX_SIZE:
+            self.dependent_user_number_table = DependentUserNumberTable(self.user_number_column_generator, self.number_template, self.subscriber_limit)
 
-    def prepare(self, inherited_range_value, customer_key):
+    @staticmethod
+    def get_chunk_size(configuration):
+        chunk_size = int(configuration.get_pipeline_chunk_size())
+        if configuration.is_partition_batch_enabled():
+            # Chunks of whole partition batches; only the last chunk of a parent ends with a partial one
+            partition_batch_planner = PartitionBatchPlanner(configuration.get_db_partition_batch_max_statements(),
+                                                            configuration.get_db_partition_batch_max_bytes())
+            statements_per_batch = partition_batch_planner.get_statements_per_batch_for_row_size(BatchGeneratorForDependents.DEPENDENT_ROW_SIZE)
+            if chunk_size > statements_per_batch:
+                chunk_size -= chunk_size % statements_per_batch
+        return chunk_size
+
+    @staticmethod
+    def get_chunk_count(subscriber_group, configuration):
+        # Chunks generated for every parent
+        return ChunkPlanner(subscriber_group.get_subscriber_group_limit(), BatchGeneratorForDependents.get_chunk_size(configuration)).get_chunk_count()
+
+    def prepare(self, inherited_range_value, customer_key, checkpoint_tag = None):
     
-        value_list = []
-        start_range_value = self.get_start_range()
-        end_range_value = self.get_end_range(start_range_value)
-        while start_range_value < end_range_value:
-            user_number_range_value = self.get_number_for_replacing(start_range_value)
-            prepared_tuple = self.__get_tuple_to_be_inserted_for_dependent(user_number_range_value, inherited_range_value, customer_key)
-            value_list.append(prepared_tuple)
-            start_range_value +=1
+        start_range_value, end_range_value = self.chunk_planner.next_chunk()
+        if self.dependent_user_number_table:
+            user_number_column = self.dependent_user_number_table.get_user_numbers(start_range_value, end_range_value, inherited_range_value)
+        else:
+            user_number_column = [self.get_user_number(range_values, inherited_range_value)
+                                  for range_values in self.place_holder_space.iterate(start_range_value, end_range_value)]
             
-        self.remaining_records_to_prepare -= value_list.__len__()
-        return self.add_info_to_batch(value_list)
-        
-    def __get_tuple_to_be_inserted_for_dependent( self, user_number_range_value, inherited_range_value, customer_key):
-        
-        # Replace the inherit tag
-        updated_subscribers_format = self.subscriber_format.replace(XMLConstants.INHERIT_TAG ,inherited_range_value)
-        
-        # Replace the number
-        updated_subscribers_format = updated_subscribers_format.replace( self.place_holder_data.get_place_holer_tag(), user_number_range_value)
-        return (customer_key, long(updated_subscribers_format), CommonUtils.unix_time_millis(datetime.datetime.now()))
\ No newline at end of file
+        # Timestamps are taken from the provider for the whole batch; no datetime math per row.
+        # Customer key of the parent is packed, so its column is just the key repeated.
+        row_count = user_number_column.__len__()
+        value_list = ColumnarBatch(row_count, [ColumnarBatch.uuid_column(customer_key * row_count),
+                                               ColumnarBatch.int64_column(user_number_column),
+                                               ColumnarBatch.int64_column(self.timestamp_provider.get_timestamps(row_count))])
+        return self.add_info_to_batch(value_list, checkpoint_tag)
+
+
+class BatchGeneratorForDeletion(BatchGenerator):
+
+    # Recomputes the customer keys of a populated subscriber group, range by range.
+    # Only possible when keys were derived from the user numbers i.e. seeded mode.
+    def __init__(self, subscriber_group, configuration):
+        BatchGenerator.__init__(self, subscriber_group, configuration)
+        self.customer_key_generator = CustomerKeyGeneratorFactory.get_customer_key_generator(configuration)
+
+    def prepare(self):
+        start_range_value, end_range_value = self.chunk_planner.next_chunk()
+
+        user_number_column = self.get_user_numbers(start_range_value, end_range_value)
+        customer_key_buffer = self.customer_key_generator.get_customer_key_buffer(user_number_column)
+        value_list = ColumnarBatch(user_number_column.__len__(), [ColumnarBatch.uuid_column(customer_key_buffer)])
+        return self.add_info_to_batch(value_list, self.get_checkpoint_tag(start_range_value, end_range_value))
+
+    def add_info_to_batch(self, prepared_batch, checkpoint_tag = None):
+        # Deletion statement is prepared only for the dummy deletion node
+        if prepared_batch.__len__() > 0:
+            return (XMLParser.get_delete_node_group_index(self.subscriber_group_type), XMLConstants.DELETE_NODE_NAME_TAG, self.subscriber_group_type, prepared_batch, checkpoint_tag)
+        else:
+            return None
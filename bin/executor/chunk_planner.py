@@ -0,0 +1,75 @@
+class ChunkPlanner:
+
+    # Splits the offset range of a subscriber group into chunks, once and up front.
+    # A chunk is the unit of work of a session worker; it is described by its
+    # (start, end) offsets only, and its rows are generated straight in that size.
+    # So, no later stage needs to merge or slice rows just to resize them. A shard of
+    # a group plans only its own offsets, starting at its start offset. Skipped ranges,
+    # e.g. the ones acknowledged by an earlier run, are left out of the plan.
+    def __init__(self, total_size, chunk_size, start_offset = 0, skipped_ranges = None):
+        self.total_size = total_size
+        self.chunk_size = chunk_size
+        self.start_offset = start_offset
+        self.end_offset = start_offset + total_size
+        self.pending_ranges = self.__get_pending_ranges(skipped_ranges or [])
+        self.reset()
+
+    def __get_pending_ranges(self, skipped_ranges):
+        # Sorted and disjoint skipped ranges are cut out of (start, end)
+        pending_ranges = []
+        next_start_offset = self.start_offset
+        for skipped_start_offset, skipped_end_offset in skipped_ranges:
+            if skipped_end_offset <= next_start_offset:
+                continue
+            if skipped_start_offset >= self.end_offset:
+                break
+            if skipped_start_offset > next_start_offset:
+                pending_ranges.append((next_start_offset, skipped_start_offset))
+            next_start_offset = skipped_end_offset
+        if next_start_offset < self.end_offset:
+            pending_ranges.append((next_start_offset, self.end_offset))
+        return pending_ranges
+
+    def get_total_size(self):
+        return self.total_size
+
+    def get_chunk_size(self):
+        return self.chunk_size
+
+    def get_start_offset(self):
+        return self.start_offset
+
+    def get_pending_ranges(self):
+        return self.pending_ranges
+
+    def get_chunk_count(self):
+        return sum((end_offset - start_offset + self.chunk_size - 1) // self.chunk_size for start_offset, end_offset in self.pending_ranges)
+
+    def has_next(self):
+        return self.pending_range_index < self.pending_ranges.__len__()
+
+    def next_chunk(self):
+        # Empty range, once all the chunks are handed out
+        if not self.has_next():
+            return (self.end_offset, self.end_offset)
+        start_offset = self.next_start_offset
+        pending_range_end_offset = self.pending_ranges[self.pending_range_index][1]
+        end_offset = min(start_offset + self.chunk_size, pending_range_end_offset)
+        self.next_start_offset = end_offset
+        if end_offset == pending_range_end_offset:
+            self.pending_range_index += 1
+            if self.has_next():
+                self.next_start_offset = self.pending_ranges[self.pending_range_index][0]
+        return (start_offset, end_offset)
+
+    def reset(self):
+        self.pending_range_index = 0
+        self.next_start_offset = self.start_offset
+        if self.pending_ranges:
+            self.next_start_offset = self.pending_ranges[0][0]
+
+    def get_chunks(self):
+        # All the chunks, independent of the ones handed out so far
+        for pending_start_offset, pending_end_offset in self.pending_ranges:
+            for start_offset in xrange(pending_start_offset, pending_end_offset, self.chunk_size):
+                yield (start_offset, min(start_offset + self.chunk_size, pending_end_offset))
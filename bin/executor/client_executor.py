@@ -1,33 +1,76 @@
-import multiprocessing
 import time
 
 import concurrent.futures
 
 from bin import global_settings
+from bin.commons.columnar_batch import ColumnarBatch
 from bin.commons.logger import DBLoaderLogger
-from bin.executor.batch_loader import BatchLoader, BatchLoaderWithDependents
+from bin.commons.shared_event import SharedEvent
+from bin.executor.batch_generator import BatchGeneratorForDeletion
+from bin.executor.batch_loader import BatchLoader
+from bin.executor.chunk_planner import ChunkPlanner
 from bin.executor.staging_area import StagingAreaForSubscribersWithDependents, \
     StagingAreaForSubscribersWithoutDependents
-from bin.commons.key_saver import CustomerKeySaver
+from bin.commons.key_journal import CustomerKeyJournal, CustomerKeyJournalReader
+from bin.commons.checkpoint_journal import RangeCheckpointJournalReader
 
 
 class ClientExecutionManager:
 
     def __init__(self):
         self.logger = DBLoaderLogger.get_instance(ClientExecutionManager.__name__)
-        manager = multiprocessing.Manager()
-        self.stop_event = manager.Event()
+        self.stop_event = SharedEvent() # Created before the group processes are forked
         self.configuration = global_settings.configuration_reader
 
-    def execute(self, subscribers_data, batch_queue):
+    def execute(self, subscribers_data, batch_queue, checkpoint_journal, resume = False):
         self.logger.debug("Starting to execute with [ %d ] number of subscriber groups... " % subscribers_data.get_count())
         start_time_stamp = time.time()
-        with concurrent.futures.ProcessPoolExecutor(max_workers = subscribers_data.get_count()) as executor:
-            for subscriber_group in subscribers_data.get_subscriber_group_list():
+
+        # Ranges acknowledged by the driver are checkpointed by the process consuming the transport
+        batch_queue.set_checkpoint_journal(checkpoint_journal)
+        checkpoint_journal_reader = RangeCheckpointJournalReader(checkpoint_journal.get_scenario())
+
+        # Large groups are split into shards, so that a single group is generated on all the cores
+        shard_size = int(self.configuration.get_pipeline_shard_size())
+        subscriber_groups = []
+        for subscriber_group in subscribers_data.get_subscriber_group_list():
+            # Groups deleted from key files are as large as the keys saved for their type
+            if subscriber_group.is_for_deletion() and not subscriber_group.is_recomputing_keys():
+                self.__convert_legacy_key_file(subscriber_group.get_subscriber_group_type())
+                subscriber_group.set_subscriber_group_limit(CustomerKeyJournalReader(subscriber_group.get_subscriber_group_type()).get_key_count())
+
+            # Resumed group skips the ranges acknowledged by earlier runs, otherwise they are
+            # forgotten, and so are the keys it saved, so that none is counted or deleted twice
+            if resume:
+                self.__resume(subscriber_group, checkpoint_journal_reader)
+            else:
+                checkpoint_journal.discard(subscriber_group.get_subscriber_group_index())
+                if not subscriber_group.is_for_deletion():
+                    CustomerKeyJournal.discard(subscriber_group.get_subscriber_group_type(), subscriber_group.get_subscriber_group_index())
+            subscriber_groups.extend(subscriber_group.split(shard_size))
+
+        max_workers = max(1, min(int(self.configuration.get_pipeline_generator_processes()), subscriber_groups.__len__()))
+        self.logger.info("Executing [ %d ] subscriber groups as [ %d ] shards on [ %d ] processes." % (subscribers_data.get_count(),
+                                                                                                     subscriber_groups.__len__(),
+                                                                                                     max_workers))
+        with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+            for subscriber_group in subscriber_groups:
                 executor.submit(client_executor_routine, ( ClientExecutor(subscriber_group, self.stop_event, batch_queue, self.configuration)))
 
         self.logger.info("Finished processing all the subscriber groups in [ %d ] seconds."% (time.time() - start_time_stamp))
                     
+    def __convert_legacy_key_file(self, subscriber_type):
+        key_count = CustomerKeyJournal.convert_legacy_file(subscriber_type)
+        if key_count > 0:
+            self.logger.info("Converted [ %d ] customer keys of subscriber type [ %s ] saved by an earlier version to the key file format." % (key_count, subscriber_type))
+
+    def __resume(self, subscriber_group, checkpoint_journal_reader):
+        acknowledged_ranges = checkpoint_journal_reader.get_acknowledged_ranges(subscriber_group.get_subscriber_group_index())
+        subscriber_group.set_subscriber_group_acknowledged_ranges(acknowledged_ranges)
+        self.logger.info("Resuming subscriber group [ %s ] with [ %d ] of [ %d ] subscribers already acknowledged." % (subscriber_group.get_subscriber_group_index(),
+                                                                                                                   sum(end_offset - start_offset for start_offset, end_offset in acknowledged_ranges),
+                                                                                                                   subscriber_group.get_subscriber_group_limit()))
+
     def shutdown(self):
         if not self.stop_event.is_set():
             self.stop_event.set()
@@ -52,6 +95,8 @@ class ClientExecutor:
         try:            
             if not self.subscriber_group.is_for_deletion():
                 client_executor_helper = ClientExecutorHelperForInsertion(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
+            elif self.subscriber_group.is_recomputing_keys():
+                client_executor_helper = ClientExecutorHelperForRecomputedDeletion(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
             else:
                 client_executor_helper = ClientExecutorHelperForDeletion(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
                 
@@ -65,6 +110,7 @@ class ClientExecutor:
 class ClientExecutorHelperForInsertion:
     
     def __init__(self, subscriber_group, stop_event, batch_queue, configuration):
+        self.logger = DBLoaderLogger.get_instance(ClientExecutorHelperForInsertion.__name__)
         self.subscriber_group = subscriber_group
         self.stop_event = stop_event
         self.staging_area = None
@@ -75,11 +121,10 @@ class ClientExecutorHelperForInsertion:
         self.__init()
         
     def __init(self):        
+        self.batch_loader = BatchLoader(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
         if self.subscriber_group.has_dependents():
-            self.batch_loader = BatchLoaderWithDependents(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
             self.staging_area = StagingAreaForSubscribersWithDependents(self.subscriber_group, self.batch_loader, self.stop_event, self.configuration)
         else:
-            self.batch_loader = BatchLoader(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
             self.staging_area = StagingAreaForSubscribersWithoutDependents(self.subscriber_group, self.batch_loader, self.stop_event, self.configuration)
             
         self.batch_loader.start()
@@ -89,6 +134,11 @@ class ClientExecutorHelperForInsertion:
         
     def wait(self):
         self.batch_loader.wait()
+        subscriber_group_name = "%s %s" % (self.subscriber_group.get_subscriber_group_name(), self.subscriber_group.get_subscriber_group_shard_range())
+        self.logger.info("Subscriber group [ %s ] pipeline memory: %s" % (subscriber_group_name,
+                                                                         self.batch_loader.get_pipeline_monitor().get_report()))
+        self.logger.info("Subscriber group [ %s ] blocked on backpressure: %s" % (subscriber_group_name,
+                                                                                 self.batch_loader.get_pipeline_monitor().get_backpressure_report()))
         
         
 class ClientExecutorHelperForDeletion:
@@ -100,19 +150,53 @@ class ClientExecutorHelperForDeletion:
         self.batch_loader = None
         
     def start(self):
-        customer_key_saver = CustomerKeySaver(self.subscriber_group.get_subscriber_group_type())
-        customer_key_saver.read()
-        customer_key_list = customer_key_saver.get_customer_key_list()
-        
-        customer_key_list_size = customer_key_list.__len__()
-        if customer_key_list_size > 0:
-            self.subscriber_group.set_subscriber_group_limit(customer_key_list_size)
+        customer_key_journal_reader = CustomerKeyJournalReader(self.subscriber_group.get_subscriber_group_type())
+        if self.subscriber_group.get_subscriber_group_limit() is None:
+            self.subscriber_group.set_subscriber_group_limit(customer_key_journal_reader.get_key_count())
+        chunk_size = int(self.configuration.get_pipeline_chunk_size())
+        start_key, end_key = self.subscriber_group.get_subscriber_group_shard_range()
+        chunk_planner = ChunkPlanner(end_key - start_key, chunk_size, start_key, self.subscriber_group.get_subscriber_group_acknowledged_ranges())
+        if chunk_planner.has_next():
             self.batch_loader = BatchLoader(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
             self.batch_loader.start()
-            self.batch_loader.put_batch((self.subscriber_group.get_subscriber_group_index(), 
-                                     self.subscriber_group.get_subscriber_group_name(), 
-                                     self.subscriber_group.get_subscriber_group_type(),
-                                     customer_key_list))
+
+            # Saved keys of the shard are handed over a chunk at a time from the mapped key files, session pool executes every chunk as a job
+            for pending_start_key, pending_end_key in chunk_planner.get_pending_ranges():
+                next_key = pending_start_key
+                for customer_key_buffer in customer_key_journal_reader.get_chunks(chunk_size, pending_start_key, pending_end_key):
+                    if self.stop_event.is_set():
+                        return
+                    key_count = customer_key_buffer.__len__() // ColumnarBatch.UUID_SIZE
+                    self.batch_loader.put_batch((self.subscriber_group.get_subscriber_group_index(), 
+                                                 self.subscriber_group.get_subscriber_group_name(), 
+                                                 self.subscriber_group.get_subscriber_group_type(),
+                                                 ColumnarBatch(key_count, [ColumnarBatch.uuid_column(customer_key_buffer)]),
+                                                 (self.subscriber_group.get_subscriber_group_index(), next_key, next_key + key_count, 1)))
+                    next_key += key_count
     def wait(self):
         if self.batch_loader:
             self.batch_loader.wait()
+
+
+class ClientExecutorHelperForRecomputedDeletion:
+
+    def __init__(self, subscriber_group, stop_event, batch_queue, configuration):
+        self.subscriber_group = subscriber_group
+        self.stop_event = stop_event
+        self.batch_queue = batch_queue
+        self.configuration = configuration
+        self.batch_generator = BatchGeneratorForDeletion(self.subscriber_group, self.configuration)
+        self.batch_loader = BatchLoader(self.subscriber_group, self.stop_event, self.batch_queue, self.configuration)
+
+    def start(self):
+        # Keys are recomputed and streamed range by range; key files are not used at all
+        self.batch_loader.start()
+        while(not self.batch_generator.is_finished() and not self.stop_event.is_set()):
+            prepared_batch = self.batch_generator.prepare()
+            if prepared_batch:
+                self.batch_loader.put_batch(prepared_batch)
+            else:
+                break
+
+    def wait(self):
+        self.batch_loader.wait()
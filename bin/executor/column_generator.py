@@ -0,0 +1,65 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class UserNumberColumnGenerator:
+
+    # Generates the user numbers of a whole offset range of the place holder space
+    # in one step. With numpy, it is a handful of int64 array operations per place
+    # holder; otherwise, plain integer math per value.
+    def __init__(self, number_template, place_holder_space):
+        self.number_template = number_template
+        self.place_holder_space = place_holder_space
+        self.vectorized = numpy is not None and number_template.fits_int64()
+
+    def is_vectorized(self):
+        return self.vectorized
+
+    def generate(self, start_offset, end_offset):
+        if self.vectorized:
+            return self.__generate_vectorized(start_offset, end_offset)
+
+        offset = self.number_template.get_offset()
+        multipliers = self.number_template.get_multipliers()
+
+        # Single place holder is the common case; no need to walk the space
+        if multipliers.__len__() == 1:
+            multiplier = multipliers[0]
+            start_value = self.place_holder_space.get_start_values()[0]
+            return [offset + (start_value + range_offset) * multiplier for range_offset in xrange(start_offset, end_offset)]
+
+        return [self.number_template.get_value(range_values) for range_values in self.place_holder_space.iterate(start_offset, end_offset)]
+
+    def __generate_vectorized(self, start_offset, end_offset):
+        offsets = numpy.arange(start_offset, end_offset, dtype=numpy.int64)
+        column = numpy.empty(offsets.size, dtype=numpy.int64)
+        column.fill(self.number_template.get_offset())
+
+        for start_value, radix, stride, multiplier in zip(self.place_holder_space.get_start_values(),
+                                                          self.place_holder_space.get_radices(),
+                                                          self.place_holder_space.get_strides(),
+                                                          self.number_template.get_multipliers()):
+            range_values = (offsets // stride) % radix
+            range_values += start_value
+            range_values *= multiplier
+            column += range_values
+        return column
+
+
+class DependentUserNumberTable:
+
+    # Dependent user numbers of two parents differ only by the inherited term. So,
+    # numbers of the dependent range are generated once and every parent's fan-out
+    # is just the table shifted by its inherited offset.
+    def __init__(self, user_number_column_generator, number_template, size):
+        self.number_template = number_template
+        self.table = user_number_column_generator.generate(0, size)
+
+    def get_user_numbers(self, start_offset, end_offset, inherited_range_value):
+        inherited_offset = inherited_range_value * self.number_template.get_inherit_multiplier()
+        column = self.table[start_offset:end_offset]
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            return column + inherited_offset
+        return [user_number + inherited_offset for user_number in column]
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+import threading
+
+try:
+    import resource
+except ImportError:
+    resource = None # Not available on Windows
+
+
+class PipelineMemoryMonitor:
+
+    # Pipeline stages a producer can be blocked on
+    DEPENDENT_QUEUE_STAGE = "dependent queue"
+    LOADING_QUEUE_STAGE = "loading queue"
+    TRANSPORT_STAGE = "transport"
+    STAGES = (DEPENDENT_QUEUE_STAGE, LOADING_QUEUE_STAGE, TRANSPORT_STAGE)
+
+    # Keeps count of the chunks held by a subscriber group i.e. put on its loading
+    # queues but not yet handed over to the session queue. Chunks are never copied
+    # on their way, so peak memory of a group is a function of these only.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chunks_in_flight = 0
+        self.rows_in_flight = 0
+        self.peak_chunks_in_flight = 0
+        self.peak_rows_in_flight = 0
+        self.chunks_forwarded = 0
+        self.rows_forwarded = 0
+        self.blocked_time_map = OrderedDict((stage, 0.0) for stage in PipelineMemoryMonitor.STAGES)
+
+    def chunk_produced(self, row_count):
+        with self.lock:
+            self.chunks_in_flight += 1
+            self.rows_in_flight += row_count
+            if self.chunks_in_flight > self.peak_chunks_in_flight:
+                self.peak_chunks_in_flight = self.chunks_in_flight
+            if self.rows_in_flight > self.peak_rows_in_flight:
+                self.peak_rows_in_flight = self.rows_in_flight
+
+    def chunk_forwarded(self, row_count):
+        with self.lock:
+            self.chunks_forwarded += 1
+            self.rows_forwarded += row_count
+            self.__release(row_count)
+
+    def chunk_dropped(self, row_count):
+        with self.lock:
+            self.__release(row_count)
+
+    def __release(self, row_count):
+        self.chunks_in_flight -= 1
+        self.rows_in_flight -= row_count
+
+    def add_blocked_time(self, stage, seconds):
+        # Time a producer waited on a full queue of the given stage; summed over producer threads
+        with self.lock:
+            self.blocked_time_map[stage] += seconds
+
+    def get_blocked_time(self, stage):
+        return self.blocked_time_map[stage]
+
+    def get_counters(self):
+        # Chunks forwarded and blocked time of a worker process, to be added to its group
+        with self.lock:
+            return (self.chunks_forwarded, self.rows_forwarded, dict(self.blocked_time_map))
+
+    def add_counters(self, counters):
+        chunks_forwarded, rows_forwarded, blocked_time_map = counters
+        with self.lock:
+            self.chunks_forwarded += chunks_forwarded
+            self.rows_forwarded += rows_forwarded
+            for stage, blocked_time in blocked_time_map.iteritems():
+                self.blocked_time_map[stage] += blocked_time
+
+    def get_peak_chunks_in_flight(self):
+        return self.peak_chunks_in_flight
+
+    def get_peak_rows_in_flight(self):
+        return self.peak_rows_in_flight
+
+    @staticmethod
+    def get_peak_rss_kb():
+        # Linux reports kilobytes; -1 when it cannot be measured
+        if resource is None:
+            return -1
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def get_report(self):
+        return "Chunks forwarded: [ %d ], Rows forwarded: [ %d ], Peak chunks in flight: [ %d ], Peak rows in flight: [ %d ], Peak RSS: [ %d ] KB" % (self.chunks_forwarded,
+                                                                                                                                              self.rows_forwarded,
+                                                                                                                                              self.peak_chunks_in_flight,
+                                                                                                                                              self.peak_rows_in_flight,
+                                                                                                                                              PipelineMemoryMonitor.get_peak_rss_kb())
+
+    def get_backpressure_report(self):
+        return ", ".join("%s: [ %.3f ] seconds" % (stage, blocked_time) for stage, blocked_time in self.blocked_time_map.iteritems())
@@ -0,0 +1,66 @@
+from Queue import Queue, Full
+import multiprocessing
+import time
+
+
+class StageQueue(Queue):
+
+    # Bounded queue between two pipeline stages. A blocking put waits while the queue
+    # is full, which pushes back on the producing stage; time spent waiting is added
+    # to the stage in the pipeline monitor. Waiting ends early when asked to stop.
+    def __init__(self, stage, capacity, stop_event, pipeline_monitor):
+        Queue.__init__(self, capacity)
+        self.stage = stage
+        self.stop_event = stop_event
+        self.pipeline_monitor = pipeline_monitor
+
+    # Returns False, when item was dropped since we are asked to stop
+    def put(self, item, block = True, timeout = None):
+        if not block or timeout is not None:
+            Queue.put(self, item, block, timeout)
+            return True
+        return put_with_backpressure(lambda block, timeout: Queue.put(self, item, block, timeout),
+                                     self.stage, self.stop_event, self.pipeline_monitor)
+
+
+class ProcessStageQueue:
+
+    # Same as the stage queue, between a producer and its worker processes. It must be
+    # created before the workers are started.
+    def __init__(self, stage, capacity, stop_event, pipeline_monitor):
+        self.queue = multiprocessing.Queue(capacity)
+        self.stage = stage
+        self.stop_event = stop_event
+        self.pipeline_monitor = pipeline_monitor
+
+    # Returns False, when item was dropped since we are asked to stop
+    def put(self, item):
+        return put_with_backpressure(lambda block, timeout: self.queue.put(item, block, timeout),
+                                     self.stage, self.stop_event, self.pipeline_monitor)
+
+    def get(self, block = True, timeout = None):
+        return self.queue.get(block, timeout)
+
+    def cancel_join_thread(self):
+        # Items nobody will take any more must not hold the producer at exit
+        self.queue.cancel_join_thread()
+
+
+def put_with_backpressure(queue_put, stage, stop_event, pipeline_monitor):
+    try:
+        queue_put(False, None)
+        return True
+    except Full:
+        pass
+
+    blocked_since = time.time()
+    try:
+        while not stop_event.is_set():
+            try:
+                queue_put(True, 1)
+                return True
+            except Full:
+                pass
+        return False
+    finally:
+        pipeline_monitor.add_blocked_time(stage, time.time() - blocked_since)
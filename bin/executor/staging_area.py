@@ -1,9 +1,13 @@
-from Queue import Queue
-import threading
+from Queue import Empty
+import multiprocessing
 
+from bin.dbclient.batch_transport import ChunkCodec
 from bin.executor.batch_generator import BatchGeneratorForSubscriberWithoutDependents, \
     BatchGeneratorForSubscriberWithDependents, BatchGeneratorForDependents
-from bin.commons.key_saver import CustomerKeySaver
+from bin.commons.key_journal import CustomerKeyJournal
+from bin.executor.batch_loader import forward_to_transport
+from bin.executor.pipeline_monitor import PipelineMemoryMonitor
+from bin.executor.stage_queue import ProcessStageQueue
 
 
 class StagingAreaForSubscribersWithoutDependents:
@@ -11,18 +15,23 @@ class StagingAreaForSubscribersWithoutDependents:
     def __init__(self, subscriber_group, batch_loader, stop_event, configuration):
         self.batch_loader = batch_loader
         self.subscriber_group = subscriber_group
-        self.customer_key_saver = CustomerKeySaver(self.subscriber_group.get_subscriber_group_type())
-        self.batch_generator = BatchGeneratorForSubscriberWithoutDependents(subscriber_group, configuration, self.customer_key_saver)
+        self.customer_key_journal = CustomerKeyJournal(self.subscriber_group.get_subscriber_group_type(),
+                                                       self.subscriber_group.get_subscriber_group_index(),
+                                                       self.subscriber_group.get_subscriber_group_shard_name())
+        self.batch_generator = BatchGeneratorForSubscriberWithoutDependents(subscriber_group, configuration, self.customer_key_journal)
         self.stop_event = stop_event
         
     def start(self):
-        while(not self.batch_generator.is_finished() and not self.stop_event.is_set()):
-            prepared_batch = self.batch_generator.prepare()
-            if prepared_batch:               
-                self.batch_loader.put_batch(prepared_batch)
-            else:
-                break
-        self.customer_key_saver.save()
+        self.customer_key_journal.open(self.subscriber_group.is_resumed())
+        try:
+            while(not self.batch_generator.is_finished() and not self.stop_event.is_set()):
+                prepared_batch = self.batch_generator.prepare()
+                if prepared_batch:               
+                    self.batch_loader.put_batch(prepared_batch)
+                else:
+                    break
+        finally:
+            self.customer_key_journal.close()
 
 class StagingAreaForSubscribersWithDependents:    
     
@@ -30,71 +39,117 @@ class StagingAreaForSubscribersWithDependents:
         self.batch_loader = batch_loader
         self.subscriber_group = subscriber_group
         self.stop_event = stop_event
-        self.dependent_processing_queue = Queue()
         self.configuration = configuration
-        self.customer_key_saver = CustomerKeySaver(self.subscriber_group.get_subscriber_group_type())
-        self.batch_generator = BatchGeneratorForSubscriberWithDependents(subscriber_group, self.dependent_processing_queue, self.configuration, self.customer_key_saver)
+
+        # Keys are queued a chunk per block; capacity is configured in keys
+        dependent_queue_capacity = int(configuration.get_pipeline_dependent_queue_capacity())
+        if dependent_queue_capacity > 0:
+            dependent_queue_capacity = max(1, dependent_queue_capacity // int(configuration.get_pipeline_chunk_size()))
+        self.dependent_processing_queue = ProcessStageQueue(PipelineMemoryMonitor.DEPENDENT_QUEUE_STAGE,
+                                                            dependent_queue_capacity,
+                                                            stop_event,
+                                                            batch_loader.get_pipeline_monitor())
+        self.result_queue = multiprocessing.Queue()
+        self.dependent_preparators = []
+        self.customer_key_journal = CustomerKeyJournal(self.subscriber_group.get_subscriber_group_type(),
+                                                       self.subscriber_group.get_subscriber_group_index(),
+                                                       self.subscriber_group.get_subscriber_group_shard_name())
+        self.batch_generator = BatchGeneratorForSubscriberWithDependents(subscriber_group, self.dependent_processing_queue, self.configuration, self.customer_key_journal)
         
     def start(self):
-        self.__start_intenal_threads()
-        while(not self.batch_generator.is_finished() and not self.stop_event.is_set()):
-            prepared_batch = self.batch_generator.prepare()
-            if prepared_batch:
-                self.batch_loader.put_batch(prepared_batch)
-            else:
-                break
-            
-            self.customer_key_saver.save()
-        # Wait on queue
-        self.dependent_processing_queue.join()
+        # Preparators are forked before the journal starts its writer thread
+        self.__start_dependent_preparators()
+        try:
+            self.customer_key_journal.open(self.subscriber_group.is_resumed())
+            try:
+                while(not self.batch_generator.is_finished() and not self.stop_event.is_set()):
+                    prepared_batch = self.batch_generator.prepare()
+                    if prepared_batch:
+                        self.batch_loader.put_batch(prepared_batch)
+                    else:
+                        break
+            finally:
+                self.customer_key_journal.close()
+        finally:
+            # Also when the keys could not be saved, so that no preparator is left behind
+            self.__wait_for_dependent_preparators()
         
-    def __start_intenal_threads(self):
-        subscriber_group_dep_list = self.subscriber_group.get_subscriber_group_dep_list()
-        for subscriber_dep_group_info  in subscriber_group_dep_list:
-            for _ in range(10):
-                # Daemon threads
-                th = DependentPreparator(self.dependent_processing_queue,
-                                         self.stop_event,
-                                         subscriber_dep_group_info,
-                                         self.batch_loader,
-                                         self.configuration)
-                th.start()
+    def __start_dependent_preparators(self):
+        for _ in range(int(self.configuration.get_pipeline_dependent_processes())):
+            dependent_preparator = DependentPreparator(self.dependent_processing_queue,
+                                                       self.result_queue,
+                                                       self.stop_event,
+                                                       self.subscriber_group.get_subscriber_group_dep_list(),
+                                                       self.batch_loader.get_batch_queue(),
+                                                       self.configuration)
+            dependent_preparator.start()
+            self.dependent_preparators.append(dependent_preparator)
+
+    def __wait_for_dependent_preparators(self):
+        # Every preparator stops on an end marker, once the blocks before it are taken
+        for _ in self.dependent_preparators:
+            self.dependent_processing_queue.put(None)
+
+        # Counters of the preparators are added to the group; a preparator that died sends none
+        pipeline_monitor = self.batch_loader.get_pipeline_monitor()
+        pending_results = self.dependent_preparators.__len__()
+        while pending_results > 0:
+            try:
+                pipeline_monitor.add_counters(self.result_queue.get(True, 2))
+                pending_results -= 1
+            except Empty:
+                if not any(dependent_preparator.is_alive() for dependent_preparator in self.dependent_preparators) and self.result_queue.empty():
+                    break
+        for dependent_preparator in self.dependent_preparators:
+            dependent_preparator.join()
+
+        if self.stop_event.is_set():
+            self.dependent_processing_queue.cancel_join_thread()
 
-class DependentPreparator(threading.Thread):
 
-    def __init__(self, queue, stop_event, subscriber_dep_group_info, batch_loader, configuration):
-        threading.Thread.__init__(self)
+class DependentPreparator(multiprocessing.Process):
+
+    # Generates the dependents of every parent in a block of customer keys, and ships
+    # them to the batch transport itself, tagged with the range of the block. Only packed key blocks are sent to it, and
+    # only its counters are sent back, so dependents are generated on all the cores.
+    def __init__(self, queue, result_queue, stop_event, subscriber_group_dep_list, batch_queue, configuration):
+        multiprocessing.Process.__init__(self)
+        self.daemon = True
         self.queue = queue
+        self.result_queue = result_queue
         self.stop_event = stop_event
-        self.setDaemon(True)
-        self.batch_loader = batch_loader
-        self.batch_generator = BatchGeneratorForDependents(subscriber_dep_group_info, configuration) 
-        
+        self.subscriber_group_dep_list = subscriber_group_dep_list
+        self.batch_queue = batch_queue
+        self.configuration = configuration
+
     def run(self):
+        pipeline_monitor = PipelineMemoryMonitor()
         try:
+            batch_generators = [BatchGeneratorForDependents(subscriber_dep_group_info, self.configuration)
+                                for subscriber_dep_group_info in self.subscriber_group_dep_list]
             while not self.stop_event.is_set():
                 try:
-                    number_tuple = self.queue.get(True, 2)
-                    self.__process(number_tuple)
-                    self.queue.task_done()
-                except:
-                    pass
-        except Exception:
-            self.__flush(True)
-            
-        self.__flush()
-        
-    def __process(self, number_tuple):
-        customer_key = number_tuple.__getitem__(0)
-        inherited_range_value = number_tuple.__getitem__(1)
-        while(not self.batch_generator.is_finished() and not self.stop_event.is_set()):
-            prepared_batch = self.batch_generator.prepare(inherited_range_value, customer_key)
-            if prepared_batch:
-                self.batch_loader.put_dependent_batch(prepared_batch)
+                    tagged_block = self.queue.get(True, 2)
+                except Empty:
+                    continue
+                if tagged_block is None:
+                    break
+                checkpoint_tag, packed_block = tagged_block
+                self.__process(ChunkCodec.unpack(packed_block), checkpoint_tag, batch_generators, pipeline_monitor)
+        except Exception as err:
+            print(err)
+        finally:
+            self.result_queue.put(pipeline_monitor.get_counters())
 
-    def __flush(self, force_stop = False):
-        # Flush only when, stop event is set or some exception has occurred to force stop it 
-        if (self.stop_event.is_set() or force_stop):
-            while not self.queue.empty():
-                self.queue.get(True, 1)
-                self.queue.task_done()
\ No newline at end of file
+    def __process(self, block, checkpoint_tag, batch_generators, pipeline_monitor):
+        customer_key_column, inherited_range_value_column = block.get_columns()
+        customer_key_buffer = customer_key_column.__getitem__(1)
+        uuid_size = block.UUID_SIZE
+        for index, inherited_range_value in enumerate(inherited_range_value_column.__getitem__(1)):
+            customer_key = customer_key_buffer[index * uuid_size:(index + 1) * uuid_size]
+            for batch_generator in batch_generators:
+                while(not batch_generator.is_finished() and not self.stop_event.is_set()):
+                    prepared_batch = batch_generator.prepare(inherited_range_value, customer_key, checkpoint_tag)
+                    if prepared_batch:
+                        pipeline_monitor.chunk_produced(prepared_batch.__getitem__(3).__len__())
+                        forward_to_transport(self.batch_queue, prepared_batch, self.stop_event, pipeline_monitor)
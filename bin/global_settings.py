@@ -1,7 +1,7 @@
-from multiprocessing.managers import BaseManager
 import os
 
 from bin.commons.configuration_reader import ConfigurationReader
+from bin.commons.startup_timer import StartupTimer
 
 script_path = os.getcwd()
 SUBSCRIBER_DATA_FILE = script_path + "/../config/subscriber_data.xml"
@@ -12,6 +12,9 @@ TMP_DIR_PATH = script_path + "/../tmp"
 configuration_reader = None
 setting_initialized = False
 
+# Started as the loader starts; phases are added as they complete
+startup_timer = StartupTimer()
+
 # To be done only once
 def initialize():
     
@@ -28,24 +31,15 @@ def initialize():
         if not os.path.exists(TMP_DIR_PATH):
             os.makedirs(TMP_DIR_PATH)
         
-        # So that property values are available during multiple process
-        MyManager.register('ConfigurationReader', ConfigurationReader)
-        manager = Manager()
-        
-        # Read configuration file for setting up logger, database etc.
+        # Read configuration file for setting up logger, database etc. It is frozen once
+        # read; processes forked or spawned later get a copy of it.
         global configuration_reader
-        configuration_reader = manager.ConfigurationReader()
-        if not configuration_reader.read(CONFIG_INI_FILE):
+        configuration_reader = ConfigurationReader()
+        if not startup_timer.measure(StartupTimer.CONFIG_PHASE, configuration_reader.read, CONFIG_INI_FILE):
             print("Failed to read configuration file: [ %s ]. Exiting Database Loader..." % CONFIG_INI_FILE)
             return False
+        configuration_reader.freeze()
         
         setting_initialized = True
         
-    return True
-
-class MyManager(BaseManager): pass
-
-def Manager():
-    manager = MyManager()
-    manager.start()
-    return manager 
\ No newline at end of file
+    return True
\ No newline at end of file
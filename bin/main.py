@@ -8,7 +8,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from bin import global_settings
 
 from bin.database_loader import DatabaseLoader
-from bin.dbclient.cassandradb.cassandra_client import CassandraClient
+from bin.dbclient.cassandradb.cassandra_client import CassandraClientFactory
 
 
 # Global Database loader object to trigger start and stop of the database loading process.
@@ -28,22 +28,25 @@ def initialize_database_loader():
     print "Database Loader Initialized..."
     return True
 
-def start_database_loader():
+def start_database_loader(resume = False):
     print "Database Loader Started..."
     print "Press Ctrl + C to stop the database loading process gracefully..."
 
-    db_client = CassandraClient()
-    status = database_loader_obj.start_population(global_settings.SUBSCRIBER_DATA_FILE, db_client)
+    db_client = CassandraClientFactory.get_cassandra_client(global_settings.configuration_reader)
+    status = database_loader_obj.start_population(global_settings.SUBSCRIBER_DATA_FILE, db_client, resume)
         
     print "Database Loader Finished..."
     return status
 
-def start_database_dependent_deleter(subscriber_type):
+def start_database_dependent_deleter(subscriber_types, recompute_keys = False, resume = False):
     print "Database Dependent Deleter started..."
     print "Press Ctrl + C to stop the process gracefully..."
 
-    db_client = CassandraClient()
-    status = database_loader_obj.start_deletion(db_client, subscriber_type)
+    db_client = CassandraClientFactory.get_cassandra_client(global_settings.configuration_reader)
+    if recompute_keys:
+        status = database_loader_obj.start_deletion(db_client, subscriber_types, global_settings.SUBSCRIBER_DATA_FILE, resume)
+    else:
+        status = database_loader_obj.start_deletion(db_client, subscriber_types, resume = resume)
         
     print "Finished removing the dependents..."
     return status
@@ -62,6 +65,10 @@ def help_msg():
     print "\n********* Welcome to Database Loader *********"
     print "Usage: 1. sh run.sh -r or py %s -r for population" % (sys.argv[0])
     print "       2. sh run.sh -d [subscriber_type] or py %s -d [subscriber_type] for deletion" % (sys.argv[0])
+    print "       3. sh run.sh -d [subscriber_type] -recompute or py %s -d [subscriber_type] -recompute for deletion" % (sys.argv[0])
+    print "          by recomputing customer keys from subscriber data (requires seeded customer key mode)"
+    print "       Several subscriber types are deleted in one run when separated by commas e.g. -d 0,1"
+    print "       Add -resume to any of them to continue an interrupted run from the ranges it already loaded"
     print "For help, type: %s -h"  % (sys.argv[0])
     
 def main():
@@ -77,13 +84,16 @@ def main():
     status = initialize_database_loader()
     if status:
         if(sys.argv[1] == "-d"):
-            if (sys.argv < 3):
+            if (len(sys.argv) < 3):
                 help_msg()
                 sys.exit()
                  
-            status = start_database_dependent_deleter(sys.argv[2].strip())
+            recompute_keys = "-recompute" in sys.argv[3:]
+            resume = "-resume" in sys.argv[3:]
+            subscriber_types = [subscriber_type.strip() for subscriber_type in sys.argv[2].split(",") if subscriber_type.strip()]
+            status = start_database_dependent_deleter(subscriber_types, recompute_keys, resume)
         else :
-            status = start_database_loader()
+            status = start_database_loader("-resume" in sys.argv[2:])
 
 # Starting point
 if __name__ == '__main__':
@@ -25,4 +25,4 @@ then
 fi
 
 # finally start the process
-python main.py $1 $2 &
\ No newline at end of file
+python main.py $1 $2 $3 $4 &
\ No newline at end of file